@@ -1,24 +1,74 @@
 from django.contrib import admin
-from .models import Teacher, Student, AuditLog, SessionToken
+from django.db import transaction
+from .models import Teacher, Subject, Student, AuditLog, SessionToken, SubjectStats
+from .caching import bump_student_data_version
+from .stats import apply_marks_changes
+from .utils import record_student_deletions
 
 @admin.register(Teacher)
 class TeacherAdmin(admin.ModelAdmin):
     list_display = ['username', 'created_at']
     readonly_fields = ['password_hash', 'salt', 'created_at']
 
+@admin.register(Subject)
+class SubjectAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['name']
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            # Renames show up in every cached student table
+            bump_student_data_version()
+
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ['name', 'subject', 'marks', 'created_at', 'updated_at']
     list_filter = ['subject', 'created_at']
-    search_fields = ['name', 'subject']
+    list_select_related = ['subject']
+    search_fields = ['name', 'subject__name']
+    
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        previous = Student.objects.filter(pk=obj.pk).values('subject_id', 'marks').first() if change else None
+        super().save_model(request, obj, form, change)
+        if previous:
+            apply_marks_changes([(previous['subject_id'], previous['marks'], None), (obj.subject_id, None, obj.marks)])
+        else:
+            apply_marks_changes([(obj.subject_id, None, obj.marks)])
+        bump_student_data_version()
+    
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        record_student_deletions([obj.id])
+        super().delete_model(request, obj)
+        apply_marks_changes([(obj.subject_id, obj.marks, None)])
+        bump_student_data_version()
+    
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        deleted = list(queryset.values_list('id', 'subject_id', 'marks'))
+        record_student_deletions(student_id for student_id, _, _ in deleted)
+        super().delete_queryset(request, queryset)
+        apply_marks_changes((subject_id, marks, None) for _, subject_id, marks in deleted)
+        bump_student_data_version()
 
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ['teacher', 'action', 'student_name', 'subject', 'timestamp']
     list_filter = ['action', 'timestamp']
-    readonly_fields = ['teacher', 'action', 'student_name', 'subject', 'old_marks', 'new_marks', 'timestamp', 'ip_address']
+    list_select_related = ['teacher', 'subject']
+    readonly_fields = [
+        'teacher', 'action', 'student', 'student_name', 'subject', 'old_marks', 'new_marks', 'timestamp', 'ip_address'
+    ]
 
 @admin.register(SessionToken)
 class SessionTokenAdmin(admin.ModelAdmin):
     list_display = ['teacher', 'created_at', 'expires_at', 'is_active']
-    readonly_fields = ['token', 'created_at']
\ No newline at end of file
+    readonly_fields = ['token', 'created_at']
+
+@admin.register(SubjectStats)
+class SubjectStatsAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'student_count', 'total_marks', 'pass_count', 'min_marks', 'max_marks', 'updated_at']
+    list_select_related = ['subject']
+    readonly_fields = ['subject', 'student_count', 'total_marks', 'pass_count', 'min_marks', 'max_marks', 'updated_at']
\ No newline at end of file
@@ -5,4 +5,12 @@ class PortalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'portal'
 
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete
+        from .auth import forget_deleted_teacher
+        from .metrics import install_query_counter
+        from .models import Teacher
 
+        connection_created.connect(install_query_counter, dispatch_uid='portal.metrics.install_query_counter')
+        post_delete.connect(forget_deleted_teacher, sender=Teacher, dispatch_uid='portal.auth.forget_deleted_teacher')
@@ -0,0 +1,137 @@
+import gzip
+import json
+import os
+from datetime import timedelta, timezone as dt_timezone
+from itertools import groupby
+from pathlib import Path
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import AuditLog
+
+# Archived column name -> ORM lookup
+ARCHIVE_COLUMNS = {
+    'id': 'id',
+    'teacher_id': 'teacher_id',
+    'teacher': 'teacher__username',
+    'action': 'action',
+    'student_id': 'student_id',
+    'student_name': 'student_name',
+    'subject': 'subject__name',
+    'old_marks': 'old_marks',
+    'new_marks': 'new_marks',
+    'timestamp': 'timestamp',
+    'ip_address': 'ip_address',
+}
+
+
+def archive_dir_for(archive_dir, day):
+    """Directory holding the partition files of one (UTC) day"""
+    return Path(archive_dir) / f'{day:%Y}' / f'{day:%m}'
+
+
+def archive_path(archive_dir, day, first_id):
+    """Partition file holding one chunk's audit entries of a day, named by its first id"""
+    return archive_dir_for(archive_dir, day) / f'audit-{day:%Y-%m-%d}-{first_id}.jsonl.gz'
+
+
+def day_partitions(archive_dir, day):
+    """A day's partition files, in id order"""
+    paths = archive_dir_for(archive_dir, day).glob(f'audit-{day:%Y-%m-%d}-*.jsonl.gz')
+    return sorted(paths, key=lambda path: int(path.name.rsplit('-', 1)[1].split('.')[0]))
+
+
+def archive_audit_log(older_than_days=None, archive_dir=None, chunk_size=5000):
+    """
+    Move audit entries older than older_than_days into gzipped, day-partitioned
+    JSON-lines files and delete them from the table, one chunk at a time. Each
+    chunk gets its own file per day, so archiving never rewrites earlier output.
+    Returns the number of archived entries.
+    """
+    older_than_days = settings.AUDIT_RETENTION_DAYS if older_than_days is None else older_than_days
+    archive_dir = archive_dir or settings.AUDIT_ARCHIVE_DIR
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+
+    archived = 0
+    while True:
+        # In id order, so the chunk is exactly the old entries in an id range
+        # and can be deleted by that range rather than by a long id list
+        rows = list(
+            AuditLog.objects.filter(timestamp__lt=cutoff)
+            .order_by('id')
+            .values_list(*ARCHIVE_COLUMNS.values())[:chunk_size]
+        )
+        if not rows:
+            return archived
+
+        entries = [dict(zip(ARCHIVE_COLUMNS, row)) for row in rows]
+        for day, day_entries in groupby(sorted(entries, key=_entry_day), key=_entry_day):
+            day_entries = list(day_entries)
+            _write_partition(archive_path(archive_dir, day, day_entries[0]['id']), day_entries)
+
+        # Only delete once the chunk is durably on disk; a crash in between
+        # leaves duplicates (or rewrites the same partition), which the reader skips
+        with transaction.atomic():
+            AuditLog.objects.filter(
+                timestamp__lt=cutoff, id__gte=entries[0]['id'], id__lte=entries[-1]['id']
+            ).delete()
+        archived += len(entries)
+
+
+def read_audit_archive(start_date, end_date, teacher=None, archive_dir=None):
+    """
+    Yield archived audit entries (as dicts) for the inclusive date range, oldest first.
+    Only the partition files inside the range are opened, one at a time; teacher
+    filters by username.
+    """
+    archive_dir = archive_dir or settings.AUDIT_ARCHIVE_DIR
+    day = start_date
+    while day <= end_date:
+        seen = set()
+        for path in day_partitions(archive_dir, day):
+            with gzip.open(path, 'rt', encoding='utf-8') as archive:
+                for line in archive:
+                    entry = json.loads(line)
+                    if entry['id'] in seen or (teacher and entry['teacher'] != teacher):
+                        continue
+                    seen.add(entry['id'])
+                    yield entry
+        day += timedelta(days=1)
+
+
+def _entry_day(entry):
+    return entry['timestamp'].astimezone(dt_timezone.utc).date()
+
+
+def _write_partition(path, entries):
+    """
+    Write entries to a new partition file. They go to a temp file that replaces the
+    partition once synced, so a crash or full disk mid-write never leaves a truncated
+    partition behind.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    try:
+        with open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as archive:
+                for entry in entries:
+                    line = json.dumps({**entry, 'timestamp': entry['timestamp'].isoformat()})
+                    archive.write((line + '\n').encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(directory):
+    # Makes the rename durable; not possible (nor needed) on Windows
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,130 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogBuffer:
+    """
+    In-process queue of unsaved AuditLog entries, written by a background thread
+    with bulk_create once batch_size entries are waiting or flush_interval seconds pass.
+    """
+
+    def __init__(self, batch_size=200, flush_interval=1.0, max_queue_size=10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def put(self, entries):
+        """Queue entries for writing; if the queue is full or stopped they are written synchronously instead"""
+        if self._stopping.is_set():
+            self._write(list(entries))
+            return
+        self._ensure_started()
+        overflow = []
+        for entry in entries:
+            try:
+                self.queue.put_nowait(entry)
+            except queue.Full:
+                overflow.append(entry)
+        if overflow:
+            logger.warning('Audit log buffer is full, writing %d entries synchronously', len(overflow))
+            self._write(overflow)
+
+    def flush(self):
+        """Write every queued entry from the calling thread"""
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return
+            self._write(batch)
+
+    def stop(self):
+        """Stop the writer thread and flush whatever is still queued"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(self.flush_interval * 2, 5))
+        self.flush()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+    def _collect(self):
+        """Wait for a full batch, or for whatever arrived within flush_interval of the first entry"""
+        try:
+            batch = [self.queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stopping.is_set():
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch + self._drain(self.batch_size - len(batch))
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            AuditLog.objects.bulk_create(batch)
+        except Exception:
+            # Fall back to row-by-row inserts so one bad entry cannot drop the whole batch
+            logger.exception('Bulk audit log write failed, retrying %d entries one by one', len(batch))
+            for entry in batch:
+                try:
+                    entry.save()
+                except Exception:
+                    logger.exception('Dropping audit log entry: %s', entry.__dict__)
+        finally:
+            if threading.current_thread() is self._thread:
+                close_old_connections()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_audit_buffer():
+    """Return the process-wide audit buffer, creating it from settings on first use"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = AuditLogBuffer(
+                    batch_size=settings.AUDIT_BUFFER_BATCH_SIZE,
+                    flush_interval=settings.AUDIT_BUFFER_FLUSH_INTERVAL,
+                    max_queue_size=settings.AUDIT_BUFFER_MAX_QUEUE_SIZE,
+                )
+    return _buffer
@@ -0,0 +1,178 @@
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from .models import SessionToken, Teacher
+from .utils import SESSION_TOKEN_LIFETIME
+
+AUTH_COOKIE_NAME = 'portal_auth'
+_SIGNING_SALT = 'portal.auth-token'
+
+
+def sign_auth_token(session_token):
+    """Signed, timestamped cookie value carrying the teacher id and the session token id"""
+    value = f'{session_token.teacher_id}:{session_token.id}'
+    return signing.TimestampSigner(salt=_SIGNING_SALT).sign(value)
+
+
+def unsign_auth_token(value):
+    """(teacher_id, token_id) from a cookie value, or None if it was tampered with or has expired"""
+    if not value:
+        return None
+    try:
+        raw = signing.TimestampSigner(salt=_SIGNING_SALT).unsign(value, max_age=SESSION_TOKEN_LIFETIME)
+        teacher_id, token_id = raw.split(':')
+        return int(teacher_id), int(token_id)
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def set_auth_cookie(response, session_token):
+    response.set_cookie(
+        AUTH_COOKIE_NAME, sign_auth_token(session_token),
+        max_age=int(SESSION_TOKEN_LIFETIME.total_seconds()),
+        secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax',
+    )
+
+
+class RevocationSet:
+    """Ids of deactivated session tokens that have not expired yet.
+
+    Reloaded from the database at most every sync_interval seconds; expired
+    tokens fail the signature age check anyway, so the set stays small.
+    Tokens revoked in another process are noticed at the next reload.
+    """
+
+    def __init__(self, sync_interval):
+        self.sync_interval = sync_interval
+        self._ids = frozenset()
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, token_id):
+        self._refresh()
+        return token_id in self._ids
+
+    async def acontains(self, token_id):
+        """`token_id in self` for async code; only a due reload leaves the event loop"""
+        if self._stale():
+            await sync_to_async(self._refresh)()
+        return token_id in self._ids
+
+    def add(self, token_id):
+        """Revoke a token in this process right away (its row must already be inactive)"""
+        with self._lock:
+            self._ids = self._ids | {token_id}
+
+    def _stale(self):
+        synced_at = self._synced_at
+        return synced_at is None or time.monotonic() - synced_at >= self.sync_interval
+
+    def _refresh(self):
+        synced_at = self._synced_at
+        if not self._stale():
+            return
+        # One thread reloads while the others keep checking against the current
+        # set; only the very first load makes them wait
+        if not self._lock.acquire(blocking=synced_at is None):
+            return
+        try:
+            if self._synced_at is synced_at:
+                self._ids = frozenset(
+                    SessionToken.objects.filter(is_active=False, expires_at__gt=timezone.now())
+                    .values_list('id', flat=True)
+                )
+                self._synced_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+
+class TeacherCache:
+    """Teachers by id, loaded on first use and kept for ttl seconds"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._teachers = {}
+
+    def get(self, teacher_id):
+        entry = self._teachers.get(teacher_id)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+        return self._store(teacher_id, Teacher.objects.filter(pk=teacher_id).first())
+
+    async def aget(self, teacher_id):
+        entry = self._teachers.get(teacher_id)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+        return self._store(teacher_id, await Teacher.objects.filter(pk=teacher_id).afirst())
+
+    def forget(self, teacher_id):
+        """Drop a cached teacher, so the next request for them reads the database"""
+        self._teachers.pop(teacher_id, None)
+
+    def _store(self, teacher_id, teacher):
+        if teacher is None:
+            # Deleted: its tokens went with it, so they are not in the revocation set
+            self._teachers.pop(teacher_id, None)
+        else:
+            self._teachers[teacher_id] = (teacher, time.monotonic())
+        return teacher
+
+
+_revocations = None
+_teachers = None
+_auth_lock = threading.Lock()
+
+
+def get_revocation_set():
+    global _revocations
+    if _revocations is None:
+        with _auth_lock:
+            if _revocations is None:
+                _revocations = RevocationSet(settings.AUTH_REVOCATION_SYNC_SECONDS)
+    return _revocations
+
+
+def get_teacher_cache():
+    global _teachers
+    if _teachers is None:
+        with _auth_lock:
+            if _teachers is None:
+                _teachers = TeacherCache(settings.AUTH_TEACHER_CACHE_SECONDS)
+    return _teachers
+
+
+def forget_deleted_teacher(sender, instance, **kwargs):
+    """
+    post_delete receiver for Teacher. Their tokens are deleted with them rather
+    than revoked, so the cached teacher is dropped instead; other processes drop
+    it within AUTH_TEACHER_CACHE_SECONDS.
+    """
+    if _teachers is not None:
+        _teachers.forget(instance.pk)
+
+
+def authenticate_signed_token(request):
+    """The teacher for the request's signed auth cookie, or None if it is invalid, expired or revoked"""
+    claims = unsign_auth_token(request.COOKIES.get(AUTH_COOKIE_NAME))
+    if claims is None:
+        return None
+    teacher_id, token_id = claims
+    if token_id in get_revocation_set():
+        return None
+    return get_teacher_cache().get(teacher_id)
+
+
+async def aauthenticate_signed_token(request):
+    """authenticate_signed_token for async requests"""
+    claims = unsign_auth_token(request.COOKIES.get(AUTH_COOKIE_NAME))
+    if claims is None:
+        return None
+    teacher_id, token_id = claims
+    if await get_revocation_set().acontains(token_id):
+        return None
+    return await get_teacher_cache().aget(teacher_id)
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite backend applying SQLITE_PRAGMAS on connect, with a configurable BEGIN mode.
+
+    With the default deferred BEGIN, a transaction that reads before it writes
+    (update_marks, the batch update, admin saves) fails at once with "database
+    is locked" if another connection committed a write in between; the busy
+    timeout does not help. OPTIONS['transaction_mode'] = 'IMMEDIATE' takes the
+    write lock at BEGIN so such transactions queue on busy_timeout instead.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.transaction_mode = params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,391 @@
+import asyncio
+import http.client
+import json
+import platform
+import threading
+import time
+from collections import deque
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+import django
+from django.core.asgi import get_asgi_application
+from django.core.servers.basehttp import ThreadedWSGIServer
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.test.testcases import QuietWSGIRequestHandler
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import Teacher, Student
+from .stats import rebuild_subject_stats
+from .utils import get_subject_ids
+
+SCENARIOS = ('login', 'home', 'update', 'add', 'delete', 'update_async', 'add_async', 'delete_async')
+# The *_async scenarios send their sync counterpart's requests to the async views
+ASYNC_API_PATHS = {
+    'update_async': '/api/async/update-marks/',
+    'add_async': '/api/async/add-student/',
+    'delete_async': '/api/async/delete-student/',
+}
+BENCH_USERNAME = 'bench_teacher'
+BENCH_PASSWORD = 'bench-pass-123'
+BENCH_SUBJECTS = ['Mathematics', 'Physics', 'Chemistry', 'Biology', 'English', 'History']
+
+
+class BenchmarkContext:
+    """Data a scenario needs to build its requests: seeded ids and a pool of rows to delete"""
+
+    def __init__(self, student_ids, deletable_ids):
+        self.student_ids = student_ids
+        self.deletable_ids = deque(deletable_ids)
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def next_number(self):
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def request_for(self, scenario, i):
+        """Return (method, path, data, is_json, expected_status) for the i-th request of a scenario"""
+        if scenario in ASYNC_API_PATHS:
+            method, _, data, is_json, expected = self.request_for(scenario[:-len('_async')], i)
+            return method, ASYNC_API_PATHS[scenario], data, is_json, expected
+        if scenario == 'login':
+            return 'POST', '/login/', {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD}, False, 302
+        if scenario == 'home':
+            return 'GET', '/', None, False, 200
+        if scenario == 'update':
+            student_id = self.student_ids[i % len(self.student_ids)]
+            return 'POST', '/api/update-marks/', {'student_id': student_id, 'marks': i % 101}, True, 200
+        if scenario == 'add':
+            number = self.next_number()
+            data = {'name': f'Bench Student {number}', 'subject': BENCH_SUBJECTS[number % len(BENCH_SUBJECTS)], 'marks': 1}
+            return 'POST', '/api/add-student/', data, True, 200
+        if scenario == 'delete':
+            return 'POST', '/api/delete-student/', {'student_id': self.deletable_ids.popleft()}, True, 200
+        raise ValueError(f'Unknown scenario: {scenario}')
+
+
+def seed_benchmark_data(students, deletable):
+    """Create the benchmark teacher and students; returns a BenchmarkContext"""
+    teacher = Teacher(username=BENCH_USERNAME)
+    teacher.set_password(BENCH_PASSWORD)
+    teacher.save()
+
+    now = timezone.now()
+    subject_ids = get_subject_ids(BENCH_SUBJECTS)
+    Student.objects.bulk_create(
+        [
+            Student(name=f'Seed Student {i:07d}', subject_id=subject_ids[BENCH_SUBJECTS[i % len(BENCH_SUBJECTS)]],
+                    marks=i % 101, created_at=now, updated_at=now)
+            for i in range(students + deletable)
+        ],
+        batch_size=1000,
+    )
+    rebuild_subject_stats()
+
+    ids = list(Student.objects.order_by('id').values_list('id', flat=True))
+    return BenchmarkContext(ids[:students], ids[students:])
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies, elapsed, errors, queries=None):
+    """Latency percentiles (ms), throughput (req/s) and, when captured, query counts"""
+    values = sorted(latencies)
+    summary = {
+        'requests': len(values),
+        'errors': errors,
+        'p50_ms': _ms(percentile(values, 50)),
+        'p95_ms': _ms(percentile(values, 95)),
+        'p99_ms': _ms(percentile(values, 99)),
+        'mean_ms': _ms(sum(values) / len(values)) if values else None,
+        'throughput_rps': round(len(values) / elapsed, 1) if elapsed else None,
+    }
+    if queries:
+        summary['queries_mean'] = round(sum(queries) / len(queries), 2)
+        summary['queries_max'] = max(queries)
+    return summary
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def run_client_benchmark(context, scenarios, iterations, warmup=5):
+    """Drive each scenario sequentially through the Django test client, counting queries per request"""
+    client = Client()
+    response = client.post('/login/', {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+    if response.status_code != 302:
+        raise RuntimeError('Benchmark login failed')
+
+    results = {}
+    for scenario in scenarios:
+        for i in range(warmup):
+            _client_request(client, *context.request_for(scenario, i)[:4])
+
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for i in range(iterations):
+            method, path, data, is_json, expected = context.request_for(scenario, warmup + i)
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = _client_request(client, method, path, data, is_json)
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(len(captured))
+            if not _succeeded(response.status_code, response.content, is_json, expected):
+                errors += 1
+        results[scenario] = summarize(latencies, time.perf_counter() - started, errors, queries)
+    return results
+
+
+def _client_request(client, method, path, data, is_json):
+    if method == 'GET':
+        return client.get(path)
+    if is_json:
+        return client.post(path, json.dumps(data), content_type='application/json')
+    return client.post(path, data)
+
+
+def _succeeded(status, body, is_json, expected):
+    if status != expected:
+        return False
+    if is_json:
+        try:
+            return json.loads(body).get('success', False)
+        except ValueError:
+            return False
+    return True
+
+
+class HttpSession:
+    """Minimal cookie-keeping HTTP client; one per driver thread"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.cookies = {}
+
+    def request(self, method, path, data=None, is_json=False):
+        body, headers = self._build(method, data, is_json)
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            content = response.read()
+            self._keep_cookies(response.headers.get_all('Set-Cookie') or [])
+            return response.status, content
+        finally:
+            conn.close()
+
+    def _build(self, method, data, is_json):
+        """(body, headers) of a request, with the session's cookies and CSRF token"""
+        headers = {'Host': self.host}
+        body = None
+        if method == 'POST':
+            if is_json:
+                body = json.dumps(data)
+                headers['Content-Type'] = 'application/json'
+            else:
+                body = urlencode(data)
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.cookies.get('csrftoken', '')
+            headers['Referer'] = f'http://{self.host}:{self.port}/'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        return body, headers
+
+    def _keep_cookies(self, set_cookie_headers):
+        for header in set_cookie_headers:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+
+    def login(self):
+        self.request('GET', '/login/')
+        status, _ = self.request('POST', '/login/', {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+        if status != 302:
+            raise RuntimeError('Benchmark login failed')
+
+
+def start_http_server(host='127.0.0.1'):
+    """Serve the project on an ephemeral port from a background thread; returns (server, port)"""
+    server = ThreadedWSGIServer((host, 0), QuietWSGIRequestHandler, allow_reuse_address=False)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, server.server_address[1]
+
+
+def run_http_benchmark(context, scenarios, iterations, concurrency, host='127.0.0.1'):
+    """Drive each scenario with `concurrency` threads over real HTTP against a threaded WSGI server"""
+    server, port = start_http_server(host)
+    try:
+        sessions = [HttpSession(host, port) for _ in range(concurrency)]
+        for session in sessions:
+            session.login()
+
+        results = {}
+        for scenario in scenarios:
+            latencies, errors = [], []
+            per_thread = max(iterations // concurrency, 1)
+            barrier = threading.Barrier(concurrency + 1)
+
+            def worker(session, offset):
+                local, failed = [], 0
+                barrier.wait()
+                for i in range(offset, offset + per_thread):
+                    method, path, data, is_json, expected = context.request_for(scenario, i)
+                    request_started = time.perf_counter()
+                    try:
+                        status, content = session.request(method, path, data, is_json)
+                        ok = _succeeded(status, content, is_json, expected)
+                    except OSError:
+                        ok = False
+                    local.append(time.perf_counter() - request_started)
+                    failed += not ok
+                latencies.extend(local)
+                errors.append(failed)
+
+            threads = [
+                threading.Thread(target=worker, args=(session, n * per_thread))
+                for n, session in enumerate(sessions)
+            ]
+            for thread in threads:
+                thread.start()
+            barrier.wait()
+            started = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            results[scenario] = summarize(latencies, time.perf_counter() - started, sum(errors))
+        return results
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class AsgiSession(HttpSession):
+    """HttpSession that calls an ASGI application in-process instead of going over a socket"""
+
+    def __init__(self, app, host='127.0.0.1', port=80):
+        super().__init__(host, port)
+        self.app = app
+
+    async def request(self, method, path, data=None, is_json=False):
+        body, headers = self._build(method, data, is_json)
+        body = (body or '').encode()
+        if body:
+            headers['Content-Length'] = str(len(body))
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query.encode(), 'root_path': '',
+            'headers': [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+            'client': ('127.0.0.1', 0), 'server': (self.host, self.port),
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # The client never disconnects early; wait until the handler is done with us
+            await asyncio.Event().wait()
+
+        status, chunks, cookies = None, [], []
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                cookies.extend(value.decode('latin-1') for name, value in message['headers'] if name.lower() == b'set-cookie')
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+
+        await self.app(scope, receive, send)
+        self._keep_cookies(cookies)
+        return status, b''.join(chunks)
+
+    async def login(self):
+        await self.request('GET', '/login/')
+        status, _ = await self.request('POST', '/login/', {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+        if status != 302:
+            raise RuntimeError('Benchmark login failed')
+
+
+def run_asgi_benchmark(context, scenarios, iterations, concurrency):
+    """Drive each scenario with `concurrency` tasks against the ASGI application on one event loop.
+
+    This is what a single-process ASGI server does minus the sockets: sync
+    views run in a thread per request while async views stay on the loop, so
+    comparing a scenario with its *_async variant shows what moving the API
+    to async views buys under concurrent clients.
+    """
+    return asyncio.run(_run_asgi_benchmark(get_asgi_application(), context, scenarios, iterations, concurrency))
+
+
+async def _run_asgi_benchmark(app, context, scenarios, iterations, concurrency):
+    sessions = [AsgiSession(app) for _ in range(concurrency)]
+    for session in sessions:
+        await session.login()
+
+    results = {}
+    for scenario in scenarios:
+        latencies, errors = [], []
+        per_task = max(iterations // concurrency, 1)
+
+        async def worker(session, offset):
+            failed = 0
+            for i in range(offset, offset + per_task):
+                method, path, data, is_json, expected = context.request_for(scenario, i)
+                request_started = time.perf_counter()
+                status, content = await session.request(method, path, data, is_json)
+                latencies.append(time.perf_counter() - request_started)
+                failed += not _succeeded(status, content, is_json, expected)
+            errors.append(failed)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(session, n * per_task) for n, session in enumerate(sessions)))
+        results[scenario] = summarize(latencies, time.perf_counter() - started, sum(errors))
+    return results
+
+
+def benchmark_metadata(**options):
+    return {
+        'timestamp': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        **options,
+    }
+
+
+def compare_results(current, baseline, tolerance):
+    """Rows of (driver, scenario, metric, baseline, current, change) plus the list of regressions.
+
+    A regression is a p95 latency more than `tolerance` (fraction) above the
+    baseline, or a throughput more than `tolerance` below it.
+    """
+    rows, regressions = [], []
+    for driver, scenarios in current.get('results', {}).items():
+        for scenario, stats in scenarios.items():
+            base = baseline.get('results', {}).get(driver, {}).get(scenario)
+            if not base:
+                continue
+            for metric, higher_is_worse in (('p95_ms', True), ('throughput_rps', False)):
+                old, new = base.get(metric), stats.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                rows.append((driver, scenario, metric, old, new, change))
+                if (change if higher_is_worse else -change) > tolerance:
+                    regressions.append(f'{driver}/{scenario} {metric}: {old} -> {new} ({change:+.0%})')
+    return rows, regressions
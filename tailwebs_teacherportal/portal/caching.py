@@ -0,0 +1,59 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .routers import reading_from_replica
+
+STUDENT_DATA_VERSION_KEY = 'portal:student-data-version'
+STUDENT_TABLE_KEY_PREFIX = 'portal:student-table'
+
+
+def get_student_data_version():
+    """Version of the student data that cached renderings are keyed by"""
+    version = cache.get(STUDENT_DATA_VERSION_KEY)
+    if version is None:
+        # Another process may set it first; whichever value wins is used by everyone
+        cache.add(STUDENT_DATA_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(STUDENT_DATA_VERSION_KEY)
+    return version
+
+
+def bump_student_data_version():
+    """Invalidate every cached rendering of the student data once the transaction commits.
+
+    The version is replaced with a fresh value rather than incremented, so
+    concurrent bumps never collapse into a version a reader has already
+    cached under (the file backend has no atomic incr).
+    """
+    transaction.on_commit(lambda: cache.set(STUDENT_DATA_VERSION_KEY, time.time_ns(), timeout=None))
+
+
+def student_table_cache_key(version, params):
+    """Cache key of one rendered student table page for the given query parameters"""
+    query = '&'.join(f'{name}={value}' for name, value in sorted(params.items()))
+    digest = hashlib.md5(query.encode()).hexdigest()
+    return f'{STUDENT_TABLE_KEY_PREFIX}:{version}:{digest}'
+
+
+def get_or_render_student_table(params, render):
+    """
+    Cached HTML of a student table page, calling render() to build it on a miss.
+
+    Only pages rendered from the primary are stored: the version is bumped when a
+    write commits there, and a replica that has not caught up yet would otherwise
+    cache its stale rows under the new version, where the writer (pinned to the
+    primary) would be served them.
+    """
+    timeout = settings.STUDENT_TABLE_CACHE_SECONDS
+    if not timeout:
+        return render()
+    key = student_table_cache_key(get_student_data_version(), params)
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        if not reading_from_replica():
+            cache.set(key, html, timeout)
+    return html
@@ -0,0 +1,125 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Sent to a subscriber that fell behind; it should re-sync and reconnect
+RESYNC_EVENT = {'type': 'resync'}
+
+
+class Subscription:
+    """One connected event stream: a bounded queue living on the stream's event loop"""
+
+    def __init__(self, loop, max_queue_size):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.overflowed = False
+
+    def offer(self, event):
+        """Queue an event; runs on self.loop"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: drop its backlog instead of buffering without bound
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_EVENT)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """
+    Fans student events out to the event streams open in this process.
+    Other backends (e.g. Redis pub/sub for several processes) need the same
+    subscribe / unsubscribe / publish methods and are selected with PORTAL_EVENT_BROKER.
+    """
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self):
+        """Register a subscription on the running event loop"""
+        subscription = Subscription(asyncio.get_running_loop(), settings.PORTAL_EVENT_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        """Deliver event to every subscription; safe to call from any thread"""
+        event = {**event, 'id': next(self._ids)}
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The stream's loop has closed
+                self.unsubscribe(subscription)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured by PORTAL_EVENT_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.PORTAL_EVENT_BROKER)()
+    return _broker
+
+
+def publish_student_event(event_type, student):
+    """Publish a create/update/delete event for a student dict once the transaction commits"""
+    event = {'type': event_type, 'student': student}
+    transaction.on_commit(lambda: get_broker().publish(event))
+
+
+def format_event(event):
+    """Encode an event as a Server-Sent Events message"""
+    if event['type'] == 'resync':
+        return 'event: resync\ndata: {}\n\n'
+    return f"id: {event['id']}\nevent: student\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream_events(subscription, broker):
+    """
+    Yield SSE messages for a subscription, with keep-alive comments while idle.
+    The stream ends after PORTAL_EVENT_STREAM_MAX_SECONDS (browsers reconnect on
+    their own) or once the client falls behind and is told to re-sync.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.PORTAL_EVENT_STREAM_MAX_SECONDS
+    try:
+        yield 'retry: 3000\n\n'
+        while loop.time() < deadline:
+            timeout = min(settings.PORTAL_EVENT_HEARTBEAT_SECONDS, deadline - loop.time())
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=max(timeout, 0))
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield format_event(event)
+            if event['type'] == 'resync':
+                break
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,69 @@
+import csv
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Exported column name -> ORM lookup
+STUDENT_EXPORT_COLUMNS = {
+    'id': 'id',
+    'name': 'name',
+    'subject': 'subject__name',
+    'marks': 'marks',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+AUDIT_LOG_EXPORT_COLUMNS = {
+    'id': 'id',
+    'teacher': 'teacher__username',
+    'action': 'action',
+    'student_id': 'student_id',
+    'student_name': 'student_name',
+    'subject': 'subject__name',
+    'old_marks': 'old_marks',
+    'new_marks': 'new_marks',
+    'timestamp': 'timestamp',
+    'ip_address': 'ip_address',
+}
+# Rows are grouped into blocks of roughly this many characters before being sent
+EXPORT_BLOCK_SIZE = 64 * 1024
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """Pseudo-buffer that hands back whatever csv.writer writes to it"""
+
+    def write(self, value):
+        return value
+
+
+def stream_export(queryset, columns, export_format):
+    """
+    Encode queryset rows as CSV or JSON lines, yielding blocks of text as soon as they fill up.
+    Rows are fetched chunk by chunk, so memory use does not grow with the table.
+    """
+    header = list(columns)
+    rows = queryset.values_list(*columns.values()).iterator(chunk_size=settings.PORTAL_EXPORT_CHUNK_SIZE)
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        lines = (writer.writerow(row) for row in rows)
+        return _blocks([writer.writerow(header)], lines)
+    lines = (json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder) + '\n' for row in rows)
+    return _blocks([], lines)
+
+
+def _blocks(first_lines, lines):
+    block = list(first_lines)
+    size = sum(len(line) for line in block)
+    for line in lines:
+        block.append(line)
+        size += len(line)
+        if size >= EXPORT_BLOCK_SIZE:
+            yield ''.join(block)
+            block = []
+            size = 0
+    if block:
+        yield ''.join(block)
@@ -0,0 +1,173 @@
+import csv
+from itertools import islice
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Student
+from .caching import bump_student_data_version
+from .stats import apply_marks_changes
+from .utils import calculate_new_marks, validate_marks, build_audit_entry, log_audit_actions, get_subject_ids
+
+REQUIRED_COLUMNS = ('name', 'subject', 'marks')
+MAX_REPORTED_ERRORS = 100
+
+
+def import_students_csv(stream, teacher, ip_address=None, chunk_size=None):
+    """
+    Import students from a CSV text stream with name, subject and marks columns.
+    Rows are read chunk by chunk, so the file is never held in memory. Existing
+    students get the imported marks added with the calculate_new_marks rule.
+    """
+    chunk_size = chunk_size or settings.PORTAL_IMPORT_CHUNK_SIZE
+    reader = csv.DictReader(stream)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV is missing required column(s): {', '.join(missing)}")
+
+    numbered_rows = ((reader.line_num, row) for row in reader)
+    summary = {'rows': 0, 'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+    while True:
+        rows = list(islice(numbered_rows, chunk_size))
+        if not rows:
+            break
+
+        # (name, subject) -> marks to add, in file order
+        additions = {}
+        for line_number, row in rows:
+            summary['rows'] += 1
+            name = (row.get('name') or '').strip()[:100]
+            subject = (row.get('subject') or '').strip()[:100]
+            marks = row.get('marks')
+
+            if not name or not subject:
+                _skip(summary, line_number, 'Name and subject are required')
+            elif not validate_marks(marks):
+                _skip(summary, line_number, 'Marks must be between 0 and 100')
+            else:
+                additions.setdefault((name, subject), []).append(int(marks))
+
+        if additions:
+            created, updated = _apply_chunk(additions, teacher, ip_address)
+            summary['created'] += created
+            summary['updated'] += updated
+
+    return summary
+
+
+def _skip(summary, line_number, error):
+    summary['skipped'] += 1
+    if len(summary['errors']) < MAX_REPORTED_ERRORS:
+        summary['errors'].append({'line': line_number, 'error': error})
+
+
+def _apply_chunk(additions, teacher, ip_address):
+    """
+    Merge one chunk into the student table with one insert of the new students, one
+    upsert of the existing ones and a single audit insert. Existing rows are locked
+    before their marks are read; a student another request inserted after that read
+    is not overwritten by the insert but locked and merged like the others.
+    """
+    names = {name for name, _ in additions}
+
+    with transaction.atomic():
+        subject_ids = get_subject_ids(subject for _, subject in additions)
+        additions = {(name, subject_ids[subject]): marks_list for (name, subject), marks_list in additions.items()}
+        existing = _lock_students(names, subject_ids.values())
+
+        new_students = {
+            key: _merge_marks(None, marks_list) for key, marks_list in additions.items() if key not in existing
+        }
+        created = {}
+        pending = new_students
+        while pending:
+            created.update(_insert_new_students(pending))
+            raced = pending.keys() - created.keys()
+            if raced:
+                existing.update(_lock_students({name for name, _ in raced}, subject_ids.values()))
+            # A raced student that is gone again by now is simply inserted on the next pass
+            pending = {key: new_students[key] for key in raced if key not in existing}
+
+        changes = []
+        students = []
+        for key, marks_list in additions.items():
+            if key in created:
+                student_id, old_marks, new_marks = created[key], None, new_students[key]
+            else:
+                student_id, old_marks = existing[key]
+                new_marks = _merge_marks(old_marks, marks_list)
+                students.append(Student(name=key[0], subject_id=key[1], marks=new_marks))
+            changes.append((student_id, key, old_marks, new_marks))
+
+        # The rows are locked, so writing the merged marks cannot lose a concurrent change
+        Student.objects.bulk_create(
+            students,
+            update_conflicts=True,
+            unique_fields=['name', 'subject'],
+            update_fields=['marks', 'updated_at'],
+        )
+
+        log_audit_actions([
+            build_audit_entry(
+                teacher=teacher,
+                action='CREATE' if old_marks is None else 'UPDATE',
+                student_name=name,
+                subject_id=subject_id,
+                old_marks=old_marks,
+                new_marks=new_marks,
+                ip_address=ip_address,
+                student_id=student_id
+            )
+            for student_id, (name, subject_id), old_marks, new_marks in changes
+        ])
+        apply_marks_changes((subject_id, old_marks, new_marks) for _, (_, subject_id), old_marks, new_marks in changes)
+        bump_student_data_version()
+
+    return len(created), len(changes) - len(created)
+
+
+def _merge_marks(old_marks, marks_list):
+    """Apply the imported marks in file order with the calculate_new_marks rule"""
+    new_marks = old_marks
+    for marks in marks_list:
+        new_marks = marks if new_marks is None else calculate_new_marks(new_marks, marks)
+    return new_marks
+
+
+def _lock_students(names, subject_ids):
+    """(name, subject_id) -> (id, marks) of the matching students, locked for the transaction"""
+    return {
+        (name, subject_id): (student_id, marks)
+        for student_id, name, subject_id, marks in Student.objects.select_for_update()
+        .filter(name__in=names, subject_id__in=subject_ids)
+        .values_list('id', 'name', 'subject_id', 'marks')
+    }
+
+
+def _insert_new_students(new_students):
+    """
+    INSERT ... ON CONFLICT DO NOTHING the (name, subject_id) -> marks students.
+    Returns (name, subject_id) -> id of those inserted; the others were created by
+    a concurrent request in the meantime and are left untouched.
+    """
+    if not new_students:
+        return {}
+    table = connection.ops.quote_name(Student._meta.db_table)
+    stamp = connection.ops.adapt_datetimefield_value(timezone.now())
+    rows = list(new_students.items())
+    columns = ['name', 'subject_id', 'marks', 'created_at', 'updated_at']
+    batch_size = connection.ops.bulk_batch_size(columns, rows)
+    created = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                f"""
+                INSERT INTO {table} ({', '.join(columns)})
+                VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(batch))}
+                ON CONFLICT (name, subject_id) DO NOTHING
+                RETURNING id, name, subject_id
+                """,
+                [value for (name, subject_id), marks in batch for value in (name, subject_id, marks, stamp, stamp)],
+            )
+            created.update(((name, subject_id), student_id) for student_id, name, subject_id in cursor.fetchall())
+    return created
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from portal.archive import archive_audit_log
+
+
+class Command(BaseCommand):
+    help = 'Move old audit log entries into compressed, date-partitioned archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.AUDIT_RETENTION_DAYS,
+            help='Archive entries older than this many days'
+        )
+        parser.add_argument('--archive-dir', default=settings.AUDIT_ARCHIVE_DIR, help='Archive root directory')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Entries moved per transaction')
+
+    def handle(self, *args, **options):
+        archived = archive_audit_log(
+            older_than_days=options['older_than_days'],
+            archive_dir=options['archive_dir'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} audit log entr{'y' if archived == 1 else 'ies'} to {options['archive_dir']}"
+        ))
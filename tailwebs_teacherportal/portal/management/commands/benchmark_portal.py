@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from portal.benchmark import (
+    SCENARIOS, seed_benchmark_data, run_client_benchmark, run_http_benchmark, run_asgi_benchmark,
+    benchmark_metadata, compare_results,
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark login, dashboard and the marks APIs against a throwaway seeded database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000, help='Students seeded before measuring')
+        parser.add_argument('--iterations', type=int, default=200, help='Measured requests per scenario and driver')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per scenario (test client only)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients of the HTTP and ASGI drivers')
+        parser.add_argument(
+            '--scenarios', default=','.join(SCENARIOS),
+            help=f"Comma-separated subset of: {', '.join(SCENARIOS)}"
+        )
+        parser.add_argument(
+            '--driver', choices=['client', 'http', 'asgi', 'both', 'all'], default='all',
+            help="'both' runs the client and http drivers, 'all' adds the in-process ASGI driver"
+        )
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='Compare against a previously saved results file')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Allowed p95/throughput change against the baseline before failing (0.2 = 20%%)'
+        )
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        results = self._run(scenarios, options)
+        report = {
+            'meta': benchmark_metadata(
+                students=options['students'], iterations=options['iterations'],
+                concurrency=options['concurrency'], scenarios=scenarios,
+            ),
+            'results': results,
+        }
+
+        for driver, driver_results in results.items():
+            self.stdout.write(f'\n{driver}')
+            self.stdout.write(f"{'scenario':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'queries':>9}{'errors':>8}")
+            for scenario, stats in driver_results.items():
+                self.stdout.write(
+                    f"{scenario:<14}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+                    f"{stats['throughput_rps']:>10}{stats.get('queries_mean', '-'):>9}{stats['errors']:>8}"
+                )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\nSaved results to {options['output']}"))
+
+        if baseline:
+            rows, regressions = compare_results(report, baseline, options['tolerance'])
+            self.stdout.write('\nAgainst baseline')
+            for driver, scenario, metric, old, new, change in rows:
+                self.stdout.write(f'{driver}/{scenario} {metric}: {old} -> {new} ({change:+.0%})')
+            if regressions:
+                raise CommandError('Regressions beyond tolerance:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions beyond tolerance'))
+
+    @override_settings(DATABASE_REPLICA_ALIASES=[])
+    def _run(self, scenarios, options):
+        # Measure against a throwaway test database (with replica routing off, as
+        # replicas would still point at the real files). On SQLite it is a file rather
+        # than :memory: so the HTTP driver's server threads can open their own connections.
+        setup_test_environment()
+        tmp_dir = None
+        if connection.vendor == 'sqlite':
+            tmp_dir = tempfile.mkdtemp(prefix='portal-bench-')
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tmp_dir, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Enough rows to delete for warm-up plus every driver, for each delete scenario
+            deletes = sum(scenario.startswith('delete') for scenario in scenarios)
+            deletable = max(deletes, 1) * (options['warmup'] + 3 * max(options['iterations'], options['concurrency']))
+            context = seed_benchmark_data(options['students'], deletable)
+
+            results = {}
+            if options['driver'] in ('client', 'both', 'all'):
+                results['client'] = run_client_benchmark(
+                    context, scenarios, options['iterations'], warmup=options['warmup']
+                )
+            if options['driver'] in ('http', 'both', 'all'):
+                results['http'] = run_http_benchmark(
+                    context, scenarios, options['iterations'], options['concurrency']
+                )
+            if options['driver'] in ('asgi', 'all'):
+                results['asgi'] = run_asgi_benchmark(
+                    context, scenarios, options['iterations'], options['concurrency']
+                )
+            return results
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            if tmp_dir:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
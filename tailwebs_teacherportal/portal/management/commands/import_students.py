@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from portal.importer import import_students_csv
+from portal.models import Teacher
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV of students (name, subject, marks) into the portal, adding marks to existing students'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument('--teacher', required=True, help='Username recorded in the audit log')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows applied per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            teacher = Teacher.objects.get(username=options['teacher'])
+        except Teacher.DoesNotExist:
+            raise CommandError(f"Teacher '{options['teacher']}' does not exist")
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                summary = import_students_csv(stream, teacher, chunk_size=options['chunk_size'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in summary['errors']:
+            self.stderr.write(f"Line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['rows']} row(s): {summary['created']} created, "
+            f"{summary['updated']} updated, {summary['skipped']} skipped"
+        ))
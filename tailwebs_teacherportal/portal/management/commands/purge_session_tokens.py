@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from portal.utils import purge_session_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired and deactivated session tokens in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.SESSION_TOKEN_SWEEP_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        deleted = purge_session_tokens(options['batch_size'], options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} session token(s)'))
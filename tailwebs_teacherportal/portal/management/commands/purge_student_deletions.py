@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from portal.utils import purge_student_deletions
+
+
+class Command(BaseCommand):
+    help = 'Delete student deletion tombstones older than STUDENT_DELETION_RETENTION_DAYS in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.SESSION_TOKEN_SWEEP_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        deleted = purge_student_deletions(options['batch_size'], options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} student tombstone(s)'))
@@ -0,0 +1,23 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from portal.archive import read_audit_archive
+
+
+class Command(BaseCommand):
+    help = 'Print archived audit log entries for a date range as JSON lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', required=True, help='First day (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', required=True, help='Last day (YYYY-MM-DD)')
+        parser.add_argument('--teacher', help='Only entries by this username')
+        parser.add_argument('--archive-dir', default=settings.AUDIT_ARCHIVE_DIR, help='Archive root directory')
+
+    def handle(self, *args, **options):
+        start, end = parse_date(options['date_from'] or ''), parse_date(options['date_to'] or '')
+        if start is None or end is None:
+            raise CommandError('--from and --to must be dates in YYYY-MM-DD format')
+
+        for entry in read_audit_archive(start, end, teacher=options['teacher'], archive_dir=options['archive_dir']):
+            self.stdout.write(json.dumps(entry))
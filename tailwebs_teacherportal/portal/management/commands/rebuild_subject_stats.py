@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from portal.models import Subject
+from portal.stats import find_stats_drift, rebuild_subject_stats
+
+
+class Command(BaseCommand):
+    help = 'Check the per-subject statistics table against a full recomputation, or rebuild it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report differences, do not rewrite')
+
+    def handle(self, *args, **options):
+        drift = find_stats_drift()
+        names = dict(Subject.objects.filter(id__in=drift).values_list('id', 'name'))
+        for subject_id, (stored, expected) in sorted(drift.items(), key=lambda item: names.get(item[0], '')):
+            self.stdout.write(f'{names.get(subject_id, subject_id)}: stored {stored}, expected {expected}')
+
+        if options['check']:
+            if drift:
+                raise CommandError(f'{len(drift)} subject(s) out of date')
+            self.stdout.write(self.style.SUCCESS('Subject statistics match the student table'))
+            return
+
+        rebuild_subject_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt subject statistics ({len(drift)} subject(s) corrected)'))
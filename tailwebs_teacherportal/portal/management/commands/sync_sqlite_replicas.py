@@ -0,0 +1,40 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from portal.caching import bump_student_data_version
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database onto each configured replica file (for local read/write splitting)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=1024, help='Pages copied per backup step')
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('sync_sqlite_replicas only works with the sqlite database profile')
+        if not settings.DATABASE_REPLICA_ALIASES:
+            raise CommandError('No replicas configured; set DATABASE_REPLICAS to a list of SQLite file paths')
+
+        source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        try:
+            for alias in settings.DATABASE_REPLICA_ALIASES:
+                # Drop our own connection so it reopens on the new file contents
+                connections[alias].close()
+                path = settings.DATABASES[alias]['NAME']
+                # The backup API gives a consistent snapshot even while the primary is being written
+                target = sqlite3.connect(path)
+                try:
+                    source.backup(target, pages=options['pages'])
+                finally:
+                    target.close()
+                self.stdout.write(f'{alias}: {path}')
+        finally:
+            source.close()
+
+        # Pages cached while the replicas lagged behind the primary are stale now
+        bump_student_data_version()
+        self.stdout.write(self.style.SUCCESS(f'Synced {len(settings.DATABASE_REPLICA_ALIASES)} replica(s)'))
@@ -0,0 +1,171 @@
+import bisect
+import hmac
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# QueryTimer of the request being handled. A context variable rather than a
+# per-connection wrapper, so queries that async views run in sync_to_async
+# worker threads are counted for the right request too.
+_query_timer = ContextVar('portal_query_timer', default=None)
+
+
+class QueryTimer:
+    """Execute wrapper counting queries and the time spent in them for one request"""
+
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def start_query_timer():
+    """Count the current context's queries into a new QueryTimer; returns (timer, reset token)"""
+    timer = QueryTimer()
+    return timer, _query_timer.set(timer)
+
+
+def stop_query_timer(token):
+    _query_timer.reset(token)
+
+
+def count_query(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection; times queries while a request timer is active"""
+    timer = _query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """connection_created receiver adding count_query to each new database connection"""
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_query)
+
+
+class ViewMetrics:
+    __slots__ = ('buckets', 'requests', 'errors', 'duration_sum', 'queries', 'db_duration', 'response_bytes')
+
+    def __init__(self, bucket_count):
+        self.buckets = [0] * (bucket_count + 1)  # last one is +Inf
+        self.requests = 0
+        self.errors = 0
+        self.duration_sum = 0.0
+        self.queries = 0
+        self.db_duration = 0.0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    """Per-process request metrics keyed by URL name and method.
+
+    Every worker process keeps its own registry, so scrape each worker
+    (or run a single process) when serving with several workers.
+    """
+
+    def __init__(self, latency_buckets):
+        self.latency_buckets = sorted(latency_buckets)
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, method, status, duration, queries, db_duration, response_bytes):
+        bucket = bisect.bisect_left(self.latency_buckets, duration)
+        with self._lock:
+            metrics = self._views.get((view, method))
+            if metrics is None:
+                metrics = self._views[(view, method)] = ViewMetrics(len(self.latency_buckets))
+            metrics.buckets[bucket] += 1
+            metrics.requests += 1
+            metrics.errors += status >= 500
+            metrics.duration_sum += duration
+            metrics.queries += queries
+            metrics.db_duration += db_duration
+            metrics.response_bytes += response_bytes
+
+    def render(self):
+        """The registry in Prometheus text exposition format"""
+        with self._lock:
+            snapshot = {
+                key: (list(m.buckets), m.requests, m.errors, m.duration_sum, m.queries, m.db_duration, m.response_bytes)
+                for key, m in self._views.items()
+            }
+
+        lines = [
+            '# HELP portal_request_duration_seconds Request latency by URL name.',
+            '# TYPE portal_request_duration_seconds histogram',
+        ]
+        for (view, method), (buckets, requests, _, duration_sum, _, _, _) in sorted(snapshot.items()):
+            labels = f'view="{_escape(view)}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(self.latency_buckets, buckets):
+                cumulative += count
+                lines.append(f'portal_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'portal_request_duration_seconds_bucket{{{labels},le="+Inf"}} {requests}')
+            lines.append(f'portal_request_duration_seconds_sum{{{labels}}} {duration_sum:.6f}')
+            lines.append(f'portal_request_duration_seconds_count{{{labels}}} {requests}')
+
+        counters = [
+            ('portal_request_errors_total', 'Responses with a 5xx status.', 2, '{}'),
+            ('portal_db_queries_total', 'SQL queries executed.', 4, '{}'),
+            ('portal_db_duration_seconds_total', 'Time spent executing SQL.', 5, '{:.6f}'),
+            ('portal_response_size_bytes_total', 'Response body bytes (streaming responses excluded).', 6, '{}'),
+        ]
+        for name, help_text, index, value_format in counters:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for (view, method), values in sorted(snapshot.items()):
+                value = value_format.format(values[index])
+                lines.append(f'{name}{{view="{_escape(view)}",method="{method}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry(settings.METRICS_LATENCY_BUCKETS)
+    return _registry
+
+
+def log_slow_request(request, view, duration, queries, db_duration):
+    """Log requests over the configured latency or query-count thresholds"""
+    slow_ms = settings.METRICS_SLOW_REQUEST_MS
+    slow_queries = settings.METRICS_SLOW_REQUEST_QUERIES
+    if (slow_ms and duration * 1000 >= slow_ms) or (slow_queries and queries >= slow_queries):
+        logger.warning(
+            'Slow request %s %s (%s): %.1f ms, %d queries, %.1f ms in DB',
+            request.method, request.path, view, duration * 1000, queries, db_duration * 1000,
+        )
+
+
+def metrics_token_matches(request):
+    """Whether the request carries the configured METRICS_TOKEN as a bearer token"""
+    token = settings.METRICS_TOKEN
+    if not token:
+        return False
+    header = request.headers.get('Authorization', '')
+    scheme, _, supplied = header.partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(supplied.strip(), token)
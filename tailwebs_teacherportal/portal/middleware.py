@@ -1,49 +1,183 @@
-from django.http import JsonResponse
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
 from django.shortcuts import redirect
 from django.urls import reverse
 from .models import SessionToken
+from .auth import aauthenticate_signed_token, authenticate_signed_token
+from .metrics import get_metrics_registry, log_slow_request, start_query_timer, stop_query_timer
+from .routers import PIN_COOKIE_NAME, choose_replica, use_replica
 
 
+# The portal middlewares are sync and async capable, so under ASGI the whole
+# chain stays on the event loop and async views are not pushed into a thread.
 
-class CustomAuthMiddleware:
+class MetricsMiddleware:
+    """Record latency, SQL query count, DB time and response size per URL name"""
+    
+    sync_capable = True
+    async_capable = True
+    
     def __init__(self, get_response):
         self.get_response = get_response
+        self.enabled = settings.METRICS_ENABLED
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
     
     def __call__(self, request):
-        # Skip authentication for login page and static files
-        excluded_paths = [reverse('login'), '/static/']
-        if any(request.path.startswith(path) for path in excluded_paths):
-            response = self.get_response(request)
-            return response
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
         
-        # Handle Django Admin URLs separately
-        if request.path.startswith('/admin/'):
-            # Let Django's built-in authentication handle admin
-            # Don't interfere with Django admin authentication
+        # Queries are counted by the connection wrapper installed in PortalConfig.ready()
+        timer, token = start_query_timer()
+        started = time.perf_counter()
+        try:
             response = self.get_response(request)
-            return response
+        finally:
+            stop_query_timer(token)
+        self._observe(request, response, time.perf_counter() - started, timer)
+        return response
+    
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
         
-        # Check for session token
-        session_token = request.session.get('auth_token')
-        if session_token:
-            try:
-                token_obj = SessionToken.objects.get(token=session_token)
-                if token_obj.is_valid():
-                    request.user = token_obj.teacher
-                    response = self.get_response(request)
-                    return response
-                else:
-                    # Token expired, clean up
-                    token_obj.delete()
-                    request.session.flush()
-            except SessionToken.DoesNotExist:
-                request.session.flush()
+        # sync_to_async copies the context, so queries run in worker threads count too
+        timer, token = start_query_timer()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_query_timer(token)
+        self._observe(request, response, time.perf_counter() - started, timer)
+        return response
+    
+    def _observe(self, request, response, duration, timer):
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        size = 0 if response.streaming else len(response.content)
+        get_metrics_registry().observe(
+            view, request.method, response.status_code, duration, timer.count, timer.duration, size
+        )
+        log_slow_request(request, view, duration, timer.count, timer.duration)
+
+
+class ReplicaRoutingMiddleware:
+    """Serve @read_from_replica views from a replica unless this client wrote recently.
+    
+    Any unsafe request pins the client to the primary for REPLICA_PIN_SECONDS
+    through a cookie, so people always see their own changes.
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # Not reset afterwards: streaming responses still read while being sent
+        use_replica(None)
+        return self._pin_writer(request, self.get_response(request))
+    
+    async def __acall__(self, request):
+        use_replica(None)
+        return self._pin_writer(request, await self.get_response(request))
+    
+    def _pin_writer(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and settings.DATABASE_REPLICA_ALIASES:
+            pin_seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE_NAME, str(int(time.time()) + pin_seconds),
+                max_age=pin_seconds, httponly=True, samesite='Lax'
+            )
+        return response
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, 'read_from_replica', False) and request.method in ('GET', 'HEAD'):
+            if not self._pinned(request):
+                use_replica(choose_replica())
+        return None
+    
+    def _pinned(self, request):
+        try:
+            return int(request.COOKIES.get(PIN_COOKIE_NAME, 0)) > time.time()
+        except ValueError:
+            return False
+
+
+class CustomAuthMiddleware:
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.signed_tokens = settings.AUTH_TOKEN_MODE == 'signed'
+        self.login_url = reverse('login')
+        # Login page, the (separately token-protected) metrics endpoint and static files
+        self.excluded_paths = (self.login_url, reverse('metrics'), settings.STATIC_URL)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if self._skips_auth(request):
+            return self.get_response(request)
+        
+        if self.signed_tokens:
+            # Signature and expiry checked in memory; no session or token row is read
+            teacher = authenticate_signed_token(request)
+        else:
+            teacher = self._session_teacher(request)
+        
+        if teacher is None:
+            # Redirect to login if not authenticated
+            return redirect(self.login_url)
+        request.user = teacher
+        return self.get_response(request)
+    
+    async def __acall__(self, request):
+        if self._skips_auth(request):
+            return await self.get_response(request)
         
-        # Redirect to login if not authenticated
-        print(request.path)
-        if request.path != reverse('login'):
-            print("-------------")
-            return redirect('login')
+        if self.signed_tokens:
+            # Only goes to the database (async ORM) when a cache needs reloading
+            teacher = await aauthenticate_signed_token(request)
+        else:
+            # Sessions have no async API in Django 4.2
+            teacher = await sync_to_async(self._session_teacher)(request)
         
-        response = self.get_response(request)
-        return response
\ No newline at end of file
+        if teacher is None:
+            return redirect(self.login_url)
+        request.user = teacher
+        return await self.get_response(request)
+    
+    def _skips_auth(self, request):
+        # Login page and static files, and Django admin, which has its own authentication
+        return request.path.startswith(self.excluded_paths) or request.path.startswith('/admin/')
+    
+    def _session_teacher(self, request):
+        """The teacher behind the session's auth token, or None (flushing a stale session)"""
+        session_token = request.session.get('auth_token')
+        if not session_token:
+            return None
+        try:
+            token_obj = SessionToken.objects.select_related('teacher').get(token=session_token)
+        except SessionToken.DoesNotExist:
+            request.session.flush()
+            return None
+        if not token_obj.is_valid():
+            # Token expired; the row itself is removed by the session token sweeper
+            request.session.flush()
+            return None
+        return token_obj.teacher
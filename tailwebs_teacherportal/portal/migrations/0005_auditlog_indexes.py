@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0004_remove_teacher_is_active_remove_teacher_is_staff'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['timestamp'], name='auditlog_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['teacher', 'timestamp'], name='auditlog_teacher_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['student_name', 'subject', 'timestamp'], name='auditlog_student_time_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0005_auditlog_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sessiontoken',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
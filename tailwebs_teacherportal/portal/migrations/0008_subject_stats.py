@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-18 11:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def populate_subject_stats(apps, schema_editor):
+    Student = apps.get_model('portal', 'Student')
+    SubjectStats = apps.get_model('portal', 'SubjectStats')
+    rows = Student.objects.values('subject').annotate(
+        student_count=Count('id'),
+        total_marks=Sum('marks'),
+        pass_count=Count('id', filter=Q(marks__gte=settings.PORTAL_PASS_MARKS)),
+        min_marks=Min('marks'),
+        max_marks=Max('marks'),
+    )
+    SubjectStats.objects.bulk_create(SubjectStats(**row) for row in rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0007_student_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=100, unique=True)),
+                ('student_count', models.IntegerField(default=0)),
+                ('total_marks', models.BigIntegerField(default=0)),
+                ('pass_count', models.IntegerField(default=0)),
+                ('min_marks', models.IntegerField(blank=True, null=True)),
+                ('max_marks', models.IntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'subject stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['subject', 'marks'], name='student_subject_marks_idx'),
+        ),
+        migrations.RunPython(populate_subject_stats, migrations.RunPython.noop),
+    ]
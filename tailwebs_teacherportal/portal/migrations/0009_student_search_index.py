@@ -0,0 +1,63 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE portal_student_fts USING fts5(name, subject, tokenize='trigram')",
+    "INSERT INTO portal_student_fts (rowid, name, subject) SELECT id, name, subject FROM portal_student",
+    """
+    CREATE TRIGGER portal_student_fts_insert AFTER INSERT ON portal_student BEGIN
+        INSERT INTO portal_student_fts (rowid, name, subject) VALUES (new.id, new.name, new.subject);
+    END
+    """,
+    """
+    CREATE TRIGGER portal_student_fts_delete AFTER DELETE ON portal_student BEGIN
+        DELETE FROM portal_student_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER portal_student_fts_update AFTER UPDATE OF name, subject ON portal_student BEGIN
+        UPDATE portal_student_fts SET name = new.name, subject = new.subject WHERE rowid = old.id;
+    END
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS portal_student_fts_insert",
+    "DROP TRIGGER IF EXISTS portal_student_fts_delete",
+    "DROP TRIGGER IF EXISTS portal_student_fts_update",
+    "DROP TABLE IF EXISTS portal_student_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # SQLite FTS5 trigram index kept in sync by triggers, so every write path
+    # (ORM, bulk upserts, raw SQL) updates it. Other databases use the LIKE fallback.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(CREATE_SQL[0])
+        except OperationalError:
+            # SQLite built without FTS5 or older than 3.34 (no trigram tokenizer)
+            return
+        for statement in CREATE_SQL[1:]:
+            cursor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0008_subject_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,239 @@
+# Generated by Django 4.2 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+# Each chunk's student names go into one name__in lookup, which must stay under
+# the 999-variable limit of SQLite builds older than 3.32
+CHUNK_SIZE = 900
+
+DROP_SEARCH_INDEX_SQL = [
+    "DROP TRIGGER IF EXISTS portal_student_fts_insert",
+    "DROP TRIGGER IF EXISTS portal_student_fts_delete",
+    "DROP TRIGGER IF EXISTS portal_student_fts_update",
+    "DROP TRIGGER IF EXISTS portal_subject_fts_update",
+    "DROP TABLE IF EXISTS portal_student_fts",
+]
+
+# The index stores the subject name; it is looked up from portal_subject and
+# refreshed for all of a subject's students when the subject is renamed
+CREATE_SEARCH_INDEX_SQL = [
+    "CREATE VIRTUAL TABLE portal_student_fts USING fts5(name, subject, tokenize='trigram')",
+    """
+    INSERT INTO portal_student_fts (rowid, name, subject)
+    SELECT portal_student.id, portal_student.name, portal_subject.name
+    FROM portal_student JOIN portal_subject ON portal_subject.id = portal_student.subject_id
+    """,
+    """
+    CREATE TRIGGER portal_student_fts_insert AFTER INSERT ON portal_student BEGIN
+        INSERT INTO portal_student_fts (rowid, name, subject)
+        VALUES (new.id, new.name, (SELECT name FROM portal_subject WHERE id = new.subject_id));
+    END
+    """,
+    """
+    CREATE TRIGGER portal_student_fts_delete AFTER DELETE ON portal_student BEGIN
+        DELETE FROM portal_student_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER portal_student_fts_update AFTER UPDATE OF name, subject_id ON portal_student BEGIN
+        UPDATE portal_student_fts
+        SET name = new.name, subject = (SELECT name FROM portal_subject WHERE id = new.subject_id)
+        WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER portal_subject_fts_update AFTER UPDATE OF name ON portal_subject BEGIN
+        UPDATE portal_student_fts SET subject = new.name
+        WHERE rowid IN (SELECT id FROM portal_student WHERE subject_id = new.id);
+    END
+    """,
+]
+
+
+def drop_search_index(apps, schema_editor):
+    # Rebuilding portal_student below would silently drop the triggers anyway
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in DROP_SEARCH_INDEX_SQL:
+            cursor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(CREATE_SEARCH_INDEX_SQL[0])
+        except OperationalError:
+            # SQLite built without FTS5 or older than 3.34 (no trigram tokenizer)
+            return
+        for statement in CREATE_SEARCH_INDEX_SQL[1:]:
+            cursor.execute(statement)
+
+
+def _chunks(queryset, *fields):
+    """values_list rows of queryset in primary key order, CHUNK_SIZE at a time"""
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', *fields)[:CHUNK_SIZE])
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def populate_subjects(apps, schema_editor):
+    Subject = apps.get_model('portal', 'Subject')
+    Student = apps.get_model('portal', 'Student')
+    AuditLog = apps.get_model('portal', 'AuditLog')
+    SubjectStats = apps.get_model('portal', 'SubjectStats')
+
+    names = set(Student.objects.values_list('subject', flat=True).distinct())
+    names |= set(AuditLog.objects.values_list('subject', flat=True).distinct())
+    names |= set(SubjectStats.objects.values_list('subject', flat=True))
+    Subject.objects.bulk_create([Subject(name=name) for name in sorted(names)], batch_size=CHUNK_SIZE)
+    subject_ids = dict(Subject.objects.values_list('name', 'id'))
+
+    for rows in _chunks(Student.objects.all(), 'subject'):
+        Student.objects.bulk_update(
+            [Student(id=student_id, subject_ref_id=subject_ids[subject]) for student_id, subject in rows],
+            ['subject_ref'],
+        )
+
+    # Link entries to the student currently holding that name and subject, if any
+    for rows in _chunks(AuditLog.objects.all(), 'student_name', 'subject'):
+        student_ids = {
+            (name, subject): student_id
+            for student_id, name, subject in Student.objects.filter(
+                name__in={student_name for _, student_name, _ in rows}
+            ).values_list('id', 'name', 'subject')
+        }
+        AuditLog.objects.bulk_update(
+            [
+                AuditLog(
+                    id=entry_id,
+                    subject_ref_id=subject_ids[subject],
+                    student_id=student_ids.get((student_name, subject)),
+                )
+                for entry_id, student_name, subject in rows
+            ],
+            ['subject_ref', 'student'],
+        )
+
+    for stats in SubjectStats.objects.all():
+        stats.subject_ref_id = subject_ids[stats.subject]
+        stats.save(update_fields=['subject_ref'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0009_student_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Subject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.RunPython(drop_search_index, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='student',
+            name='subject_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='portal.subject'),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='subject_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='portal.subject'),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='student',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='audit_entries', to='portal.student'),
+        ),
+        migrations.AddField(
+            model_name='subjectstats',
+            name='subject_ref',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='portal.subject'),
+        ),
+        # Irreversible: the old string columns cannot be re-added to populated tables
+        migrations.RunPython(populate_subjects),
+        migrations.AlterUniqueTogether(
+            name='student',
+            unique_together=set(),
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='student_subject_marks_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='auditlog_student_time_idx',
+        ),
+        migrations.RemoveField(
+            model_name='student',
+            name='subject',
+        ),
+        migrations.RemoveField(
+            model_name='auditlog',
+            name='subject',
+        ),
+        migrations.RemoveField(
+            model_name='subjectstats',
+            name='subject',
+        ),
+        migrations.RenameField(
+            model_name='student',
+            old_name='subject_ref',
+            new_name='subject',
+        ),
+        migrations.RenameField(
+            model_name='auditlog',
+            old_name='subject_ref',
+            new_name='subject',
+        ),
+        migrations.RenameField(
+            model_name='subjectstats',
+            old_name='subject_ref',
+            new_name='subject',
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='subject',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='students', to='portal.subject'),
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='subject',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='audit_entries', to='portal.subject'),
+        ),
+        migrations.AlterField(
+            model_name='subjectstats',
+            name='subject',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='portal.subject'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='student',
+            unique_together={('name', 'subject')},
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['subject', 'marks'], name='student_subject_marks_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['student_name', 'subject', 'timestamp'], name='auditlog_student_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['student', 'timestamp'], name='auditlog_student_ref_time_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
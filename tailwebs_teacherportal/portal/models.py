@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.db import models
 import hashlib
+import hmac
 import secrets
 from datetime import datetime
 
+PASSWORD_HASH_ALGORITHM = 'pbkdf2_sha256'
+
 class Teacher(models.Model):
     username = models.CharField(max_length=150, unique=True)
     password_hash = models.CharField(max_length=128)
@@ -11,42 +15,102 @@ class Teacher(models.Model):
     
     
     def set_password(self, raw_password):
-        """Custom password hashing with salt"""
+        """Hash the password with salted PBKDF2-HMAC-SHA256, storing the algorithm and cost with it"""
         self.salt = secrets.token_hex(16)
-        # Combine password with salt and hash multiple times for security
-        combined = f"{raw_password}{self.salt}"
-        for _ in range(10000):  # Multiple iterations for stronger security
-            combined = hashlib.sha256(combined.encode()).hexdigest()
-        self.password_hash = combined
+        iterations = settings.PASSWORD_HASH_ITERATIONS
+        digest = self._pbkdf2(raw_password, iterations)
+        self.password_hash = f"{PASSWORD_HASH_ALGORITHM}${iterations}${digest}"
     
     def check_password(self, raw_password):
-        """Verify password against stored hash"""
+        """Verify password against stored hash in constant time, upgrading old hashes on success"""
+        algorithm, iterations, expected = self._split_password_hash()
+        if algorithm == PASSWORD_HASH_ALGORITHM:
+            actual = self._pbkdf2(raw_password, iterations)
+        else:
+            actual = self._legacy_sha256(raw_password)
+        
+        is_valid = hmac.compare_digest(actual.encode(), expected.encode())
+        if is_valid and self.password_needs_rehash() and self.pk:
+            self.set_password(raw_password)
+            self.save(update_fields=['password_hash', 'salt'])
+        return is_valid
+    
+    def password_needs_rehash(self):
+        """True if the stored hash uses an old algorithm or a different cost than configured"""
+        algorithm, iterations, _ = self._split_password_hash()
+        return algorithm != PASSWORD_HASH_ALGORITHM or iterations != settings.PASSWORD_HASH_ITERATIONS
+    
+    def _split_password_hash(self):
+        # "<algorithm>$<iterations>$<hex digest>"; hashes without a prefix predate it
+        parts = self.password_hash.split('$')
+        if len(parts) == 3 and parts[1].isdigit():
+            return parts[0], int(parts[1]), parts[2]
+        return 'legacy_sha256', None, self.password_hash
+    
+    def _pbkdf2(self, raw_password, iterations):
+        return hashlib.pbkdf2_hmac('sha256', raw_password.encode(), self.salt.encode(), iterations).hex()
+    
+    def _legacy_sha256(self, raw_password):
+        # Original scheme: 10,000 chained SHA-256 rounds, only kept to verify and upgrade old hashes
         combined = f"{raw_password}{self.salt}"
         for _ in range(10000):
             combined = hashlib.sha256(combined.encode()).hexdigest()
-        return combined == self.password_hash
+        return combined
     
     def __str__(self):
         return self.username
 
+class Subject(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    
+    def __str__(self):
+        return self.name
+
 class Student(models.Model):
     name = models.CharField(max_length=100)
-    subject = models.CharField(max_length=100)
+    subject = models.ForeignKey(Subject, on_delete=models.PROTECT, related_name='students')
     marks = models.IntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         unique_together = ['name', 'subject']
+        indexes = [
+            models.Index(fields=['subject', 'marks'], name='student_subject_marks_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.subject}"
 
+class SubjectStats(models.Model):
+    """Running per-subject aggregates, updated alongside every Student write"""
+    subject = models.OneToOneField(Subject, on_delete=models.CASCADE, related_name='stats')
+    student_count = models.IntegerField(default=0)
+    total_marks = models.BigIntegerField(default=0)
+    pass_count = models.IntegerField(default=0)
+    min_marks = models.IntegerField(null=True, blank=True)
+    max_marks = models.IntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'subject stats'
+    
+    def __str__(self):
+        return f"{self.subject} ({self.student_count} students)"
+
+class StudentDeletion(models.Model):
+    """Tombstone for a deleted student so delta sync clients can drop the row"""
+    student_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f"Student {self.student_id} deleted at {self.deleted_at}"
+
 class SessionToken(models.Model):
     teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE)
     token = models.CharField(max_length=128, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    expires_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
     is_active = models.BooleanField(default=True)
     
     def is_valid(self):
@@ -62,12 +126,25 @@ class AuditLog(models.Model):
     
     teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE)
     action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # No database constraint so entries outlive the student; student_name keeps
+    # the name as it was when the action happened
+    student = models.ForeignKey(
+        Student, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='audit_entries'
+    )
     student_name = models.CharField(max_length=100)
-    subject = models.CharField(max_length=100)
+    subject = models.ForeignKey(Subject, on_delete=models.PROTECT, related_name='audit_entries')
     old_marks = models.IntegerField(null=True, blank=True)
     new_marks = models.IntegerField(null=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     ip_address = models.GenericIPAddressField()
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp'], name='auditlog_timestamp_idx'),
+            models.Index(fields=['teacher', 'timestamp'], name='auditlog_teacher_time_idx'),
+            models.Index(fields=['student_name', 'subject', 'timestamp'], name='auditlog_student_time_idx'),
+            models.Index(fields=['student', 'timestamp'], name='auditlog_student_ref_time_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.teacher.username} - {self.action} - {self.student_name}"
\ No newline at end of file
@@ -0,0 +1,55 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+# Replica alias chosen for the current request, or None to read from the primary
+_read_alias = ContextVar('portal_read_alias', default=None)
+
+PIN_COOKIE_NAME = 'db_pin'
+
+
+def read_from_replica(view_func):
+    """Mark a read-only view whose queries may be served by a replica.
+
+    Apply it as the outermost decorator so ReplicaRoutingMiddleware sees it.
+    """
+    view_func.read_from_replica = True
+    return view_func
+
+
+def use_replica(alias):
+    """Route the current request's reads to `alias` (None for the primary)"""
+    _read_alias.set(alias)
+
+
+def reading_from_replica():
+    """True when the current request's reads are routed to a replica"""
+    return _read_alias.get() is not None
+
+
+def choose_replica():
+    replicas = settings.DATABASE_REPLICA_ALIASES
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    """Send reads of replica-marked views to a replica and everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections['default'].in_atomic_block:
+            return 'default'
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        return db == 'default'
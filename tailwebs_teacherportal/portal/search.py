@@ -0,0 +1,91 @@
+from itertools import product
+from django.db import connection, connections, router
+from django.db.models import Q
+from .models import Student
+from .utils import prefix_filter
+
+FTS_TABLE = 'portal_student_fts'
+# Fuzzy matches must contain at least this fraction of the query's trigrams
+MIN_TRIGRAM_SIMILARITY = 0.3
+
+_fts_available = None
+
+
+def fts_available():
+    """True when the FTS5 trigram index created by the migrations exists (SQLite only)"""
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def search_students(query, limit=20):
+    """
+    Students whose name or subject matches query, best matches first.
+    Substring and prefix matches come first; if there are fewer than limit of them
+    the rest is filled with typo-tolerant matches that share enough trigrams with query.
+    """
+    query = ' '.join(query.split())[:100]
+    if not query:
+        return []
+
+    students = Student.objects.select_related('subject')
+
+    if len(query) < 3:
+        # Trigram indexes need three characters; short queries are a name prefix lookup.
+        # istartswith (LIKE) cannot use the name index, so each case variant of the
+        # prefix is its own bounded range scan, merged in name order.
+        found = []
+        for variant in _case_variants(query):
+            found += students.filter(prefix_filter('name', variant)).order_by('name', 'subject_id')[:limit]
+        return sorted(found, key=lambda student: (student.name, student.subject_id))[:limit]
+
+    if not fts_available():
+        students = students.filter(Q(name__icontains=query) | Q(subject__name__icontains=query))
+        return list(students.order_by('name', 'subject_id')[:limit])
+
+    ids = _match(_phrase(query), limit)
+    if len(ids) < limit:
+        candidates = _match(' OR '.join(_phrase(gram) for gram in _trigrams(query)), limit * 5, exclude=ids)
+        ids += [student_id for student_id, similarity in _rank_fuzzy(query, candidates) if similarity][:limit - len(ids)]
+
+    found = students.in_bulk(ids)
+    return [found[student_id] for student_id in ids if student_id in found]
+
+
+def _case_variants(text):
+    return {''.join(chars) for chars in product(*({char.lower(), char.upper()} for char in text))}
+
+
+def _phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _trigrams(text):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _match(expression, limit, exclude=()):
+    exclude = list(exclude)
+    placeholders = ', '.join(['%s'] * len(exclude))
+    not_in = f'AND rowid NOT IN ({placeholders})' if exclude else ''
+    # Same database the ORM reads students from, which may be a replica
+    with connections[router.db_for_read(Student)].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s {not_in} ORDER BY rank LIMIT %s',
+            [expression, *exclude, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _rank_fuzzy(query, candidate_ids):
+    """Order fuzzy candidates by trigram similarity to query, dropping weak matches"""
+    if not candidate_ids:
+        return []
+    query_grams = _trigrams(query)
+    ranked = []
+    for student_id, name, subject in Student.objects.filter(id__in=candidate_ids).values_list('id', 'name', 'subject__name'):
+        similarity = max(len(query_grams & _trigrams(value)) / len(query_grams) for value in (name, subject))
+        ranked.append((student_id, similarity if similarity >= MIN_TRIGRAM_SIMILARITY else 0))
+    return sorted(ranked, key=lambda item: -item[1])
@@ -0,0 +1,102 @@
+import gzip
+import mimetypes
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # brotli variants are skipped without the optional package
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico')
+# Smaller files gain nothing worth the extra variant
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also writes .gz and (with brotli installed) .br copies of collected files"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                # The unhashed copy is what {% static %} links to while DEBUG is on
+                names.update((name, hashed_name))
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        # Compress once every pass has settled the final file contents
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self._write_compressed(name)
+
+    def _write_compressed(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content, quality=11)))
+        for suffix, compressed in variants:
+            # Keep a variant only when it actually saves bytes on the wire
+            if len(compressed) < len(content) * 0.95:
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
+
+
+@lru_cache(maxsize=None)
+def hashed_static_names():
+    """Hashed file names listed in the staticfiles manifest; those never change content"""
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def accepted_encodings(request):
+    """Content codings the client accepts (ignoring any explicitly refused with q=0)"""
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q=') and quality[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def select_static_variant(request, path):
+    """(file path, Content-Encoding or None, whether variants exist) to serve for a STATIC_ROOT file"""
+    accepted = accepted_encodings(request)
+    has_variants = False
+    for encoding, suffix in ENCODINGS:
+        if os.path.isfile(path + suffix):
+            has_variants = True
+            if encoding in accepted or '*' in accepted:
+                return path + suffix, encoding, True
+    return path, None, has_variants
+
+
+def is_static_variant(name):
+    """Whether name is a precompressed copy, which is only served through Accept-Encoding"""
+    return name.endswith(tuple(suffix for _, suffix in ENCODINGS))
+
+
+def static_content_type(name):
+    content_type, _ = mimetypes.guess_type(name)
+    return content_type or 'application/octet-stream'
+
+
+def static_cache_control(name):
+    if name in hashed_static_names():
+        return IMMUTABLE_CACHE_CONTROL
+    return f'public, max-age={settings.STATIC_MAX_AGE}'
@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from .models import Student, SubjectStats
+
+
+def apply_marks_changes(changes):
+    """
+    Fold student writes into SubjectStats. changes is an iterable of
+    (subject_id, old_marks, new_marks) with old_marks None for a created student
+    and new_marks None for a deleted one. Call it after the writes, inside their transaction.
+    """
+    pass_marks = settings.PORTAL_PASS_MARKS
+    deltas = {}
+    for subject_id, old_marks, new_marks in changes:
+        delta = deltas.setdefault(subject_id, {'count': 0, 'total': 0, 'passed': 0, 'added': [], 'removed': []})
+        if old_marks is not None:
+            delta['count'] -= 1
+            delta['total'] -= old_marks
+            delta['passed'] -= old_marks >= pass_marks
+            delta['removed'].append(old_marks)
+        if new_marks is not None:
+            delta['count'] += 1
+            delta['total'] += new_marks
+            delta['passed'] += new_marks >= pass_marks
+            delta['added'].append(new_marks)
+
+    with transaction.atomic():
+        for subject_id, delta in deltas.items():
+            _apply_subject_delta(subject_id, delta)
+
+
+def _apply_subject_delta(subject_id, delta):
+    stats = _locked_subject_stats(subject_id)
+
+    stats.student_count += delta['count']
+    stats.total_marks += delta['total']
+    stats.pass_count += delta['passed']
+
+    if stats.student_count <= 0:
+        stats.delete()
+        return
+
+    if any(marks in (stats.min_marks, stats.max_marks) for marks in delta['removed']):
+        # The current extreme may have gone; read it back from the (subject, marks) index
+        extremes = Student.objects.filter(subject_id=subject_id).aggregate(low=Min('marks'), high=Max('marks'))
+        stats.min_marks, stats.max_marks = extremes['low'], extremes['high']
+    elif delta['added']:
+        candidates = delta['added'] + [marks for marks in (stats.min_marks, stats.max_marks) if marks is not None]
+        stats.min_marks, stats.max_marks = min(candidates), max(candidates)
+    stats.save()
+
+
+def _locked_subject_stats(subject_id):
+    """The subject's SubjectStats row, locked until the transaction ends; created first if missing"""
+    rows = SubjectStats.objects.select_for_update().filter(subject_id=subject_id)
+    stats = rows.first()
+    while stats is None:
+        # A missing row cannot be locked, so two first writes for a subject would both
+        # insert one; create it without conflicting and lock whichever row won. Loops
+        # only if a concurrent write emptied the subject and deleted the row meanwhile.
+        SubjectStats.objects.bulk_create([SubjectStats(subject_id=subject_id)], ignore_conflicts=True)
+        stats = rows.first()
+    return stats
+
+
+def compute_subject_stats():
+    """Per-subject aggregates, keyed by subject id, recomputed from scratch with a full scan of Student"""
+    rows = Student.objects.values('subject_id').annotate(
+        student_count=Count('id'),
+        total_marks=Sum('marks'),
+        pass_count=Count('id', filter=Q(marks__gte=settings.PORTAL_PASS_MARKS)),
+        min_marks=Min('marks'),
+        max_marks=Max('marks'),
+    )
+    return {row.pop('subject_id'): row for row in rows}
+
+
+def rebuild_subject_stats():
+    """Replace SubjectStats with a full recomputation"""
+    with transaction.atomic():
+        SubjectStats.objects.all().delete()
+        SubjectStats.objects.bulk_create(
+            SubjectStats(subject_id=subject_id, **values) for subject_id, values in compute_subject_stats().items()
+        )
+
+
+def find_stats_drift():
+    """Compare SubjectStats with a full recomputation; returns {subject_id: (stored, expected)} for mismatches"""
+    expected = compute_subject_stats()
+    fields = ['student_count', 'total_marks', 'pass_count', 'min_marks', 'max_marks']
+    stored = {row.pop('subject_id'): row for row in SubjectStats.objects.values('subject_id', *fields)}
+    return {
+        subject_id: (stored.get(subject_id), expected.get(subject_id))
+        for subject_id in set(expected) | set(stored)
+        if stored.get(subject_id) != expected.get(subject_id)
+    }
+
+
+def serialize_subject_stats(stats):
+    """JSON-ready representation of one subject's figures (select_related('subject'))"""
+    return {
+        'subject': stats.subject.name,
+        'count': stats.student_count,
+        'mean': round(stats.total_marks / stats.student_count, 2),
+        'min': stats.min_marks,
+        'max': stats.max_marks,
+        'pass_rate': round(stats.pass_count / stats.student_count, 4),
+    }
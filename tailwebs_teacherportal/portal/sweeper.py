@@ -0,0 +1,55 @@
+import logging
+import threading
+from django.conf import settings
+from django.db import close_old_connections
+from .utils import purge_session_tokens, purge_student_deletions
+
+logger = logging.getLogger(__name__)
+
+
+class SessionTokenSweeper(threading.Thread):
+    """Background thread that purges expired session tokens and old student tombstones every interval seconds"""
+
+    def __init__(self, interval, batch_size=1000, max_batches=None):
+        super().__init__(name='session-token-sweeper', daemon=True)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                deleted = purge_session_tokens(self.batch_size, self.max_batches)
+                if deleted:
+                    logger.info('Purged %d session token(s)', deleted)
+                deleted = purge_student_deletions(self.batch_size, self.max_batches)
+                if deleted:
+                    logger.info('Purged %d student tombstone(s)', deleted)
+            except Exception:
+                logger.exception('Session token sweep failed')
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        self.stopped.set()
+
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def start_session_token_sweeper():
+    """Start the in-process sweeper if SESSION_TOKEN_SWEEP_INTERVAL is set; safe to call more than once"""
+    global _sweeper
+    if settings.SESSION_TOKEN_SWEEP_INTERVAL <= 0:
+        return None
+    with _sweeper_lock:
+        if _sweeper is None:
+            _sweeper = SessionTokenSweeper(
+                interval=settings.SESSION_TOKEN_SWEEP_INTERVAL,
+                batch_size=settings.SESSION_TOKEN_SWEEP_BATCH_SIZE,
+                max_batches=settings.SESSION_TOKEN_SWEEP_MAX_BATCHES or None,
+            )
+            _sweeper.start()
+    return _sweeper
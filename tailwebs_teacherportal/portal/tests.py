@@ -1,3 +1,459 @@
-from django.test import TestCase
+import base64
+import gzip
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from . import auth, importer, views
+from .auth import AUTH_COOKIE_NAME
+from .models import AuditLog, SessionToken, Student, Subject, Teacher
+from .stats import apply_marks_changes, find_stats_drift, rebuild_subject_stats
+from .utils import SESSION_TOKEN_LIFETIME, add_student_marks, decode_cursor, encode_cursor
+
+PASSWORD = 'pw-12345'
+
+
+def raw_cursor(values):
+    """A cursor as a client could hand-craft it, bypassing encode_cursor"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+class PortalTestCase(TestCase):
+    """Logged-in client and a Mathematics subject"""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = Teacher(username='teacher')
+        self.teacher.set_password(PASSWORD)
+        self.teacher.save()
+        self.login(self.client)
+        self.subject = Subject.objects.create(name='Mathematics')
+
+    def login(self, client):
+        response = client.post('/login/', {'username': 'teacher', 'password': PASSWORD})
+        self.assertEqual(response.status_code, 302)
+        return client
+
+    def post_json(self, path, data):
+        response = self.client.post(path, json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def add(self, name, marks, subject='Mathematics'):
+        return self.post_json('/api/add-student/', {'name': name, 'subject': subject, 'marks': marks})
+
+
+class CursorTests(PortalTestCase):
+
+    def test_round_trip(self):
+        cursor = encode_cursor(['Asha', 3])
+        self.assertEqual(decode_cursor(cursor, 2), ['Asha', 3])
+
+    def test_malformed_cursors_decode_to_none(self):
+        cursor = encode_cursor(['Asha', 3])
+        self.assertIsNone(decode_cursor(cursor[:-3] + '!!!', 2))
+        self.assertIsNone(decode_cursor(raw_cursor({'name': 'Asha'}), 2))
+        self.assertIsNone(decode_cursor(cursor, 3))
+        self.assertIsNone(decode_cursor('', 2))
+
+    def test_values_must_fit_the_fields(self):
+        fields = [Student._meta.get_field('name'), Student._meta.get_field('subject_id')]
+        self.assertEqual(decode_cursor(raw_cursor(['Asha', '3']), 2, fields), ['Asha', 3])
+        self.assertIsNone(decode_cursor(raw_cursor(['Asha', 'x']), 2, fields))
+        self.assertIsNone(decode_cursor(raw_cursor(['Asha', None]), 2, fields))
+        self.assertIsNone(decode_cursor(raw_cursor(['Asha', {'id': 1}]), 2, fields))
+
+    def test_tampered_cursor_falls_back_to_the_first_page(self):
+        for name in ('Asha', 'Bela', 'Chen'):
+            Student.objects.create(name=name, subject=self.subject, marks=50)
+
+        for values in (['a', 'x'], ['a', None], ['a', 1, 2]):
+            response = self.client.get('/api/students/', {'after': raw_cursor(values), 'per_page': 2})
+            self.assertEqual([s['name'] for s in response.json()['students']], ['Asha', 'Bela'])
+            self.assertEqual(self.client.get('/', {'after': raw_cursor(values)}).status_code, 200)
+
+    def test_pages_follow_the_cursor(self):
+        for name in ('Asha', 'Bela', 'Chen'):
+            Student.objects.create(name=name, subject=self.subject, marks=50)
+
+        first = self.client.get('/api/students/', {'per_page': 2}).json()
+        second = self.client.get('/api/students/', {'per_page': 2, 'after': first['next_cursor']}).json()
+        self.assertEqual([s['name'] for s in second['students']], ['Chen'])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_invalid_sync_cursor(self):
+        response = self.client.get('/api/students/', {'since': raw_cursor(['yesterday'])}).json()
+        self.assertEqual(response, {'success': False, 'error': 'Invalid sync cursor'})
+
+
+class AddStudentMarksTests(PortalTestCase):
+
+    def test_create_then_add(self):
+        student_id, old_marks, new_marks = add_student_marks('Asha', self.subject.id, 40)
+        self.assertIsNone(old_marks)
+        self.assertEqual(new_marks, 40)
+
+        self.assertEqual(add_student_marks('Asha', self.subject.id, 30), (student_id, 40, 70))
+        self.assertEqual(Student.objects.get(id=student_id).marks, 70)
+
+    def test_api_rejects_malformed_bodies(self):
+        response = self.client.post('/api/add-student/', json.dumps(['Asha']), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'success': False, 'error': 'The request body must be a JSON object'})
+        self.assertEqual(self.add(5, 40), {'success': False, 'error': 'Name and subject must be strings'})
+
+    def test_total_over_100_is_rejected(self):
+        student_id, _, _ = add_student_marks('Asha', self.subject.id, 80)
+        self.assertIsNone(add_student_marks('Asha', self.subject.id, 30))
+        self.assertEqual(Student.objects.get(id=student_id).marks, 80)
+        self.assertEqual(add_student_marks('Asha', self.subject.id, 20), (student_id, 80, 100))
+
+    def test_adding_to_zero_marks_is_an_update(self):
+        student_id, _, _ = add_student_marks('Asha', self.subject.id, 0)
+        self.assertEqual(add_student_marks('Asha', self.subject.id, 0), (student_id, 0, 0))
+
+    def test_api_reports_create_update_and_rejection(self):
+        created = self.add('Asha', 70)
+        self.assertEqual((created['old_marks'], created['new_marks']), (None, 70))
+        self.assertEqual(created['message'], 'Student added successfully')
+
+        updated = self.add('Asha', 20)
+        self.assertTrue(updated['success'])
+        self.assertEqual((updated['old_marks'], updated['new_marks']), (70, 90))
+
+        rejected = self.add('Asha', 20)
+        self.assertEqual(rejected, {'success': False, 'error': 'Total marks would exceed 100 (current: 90, adding: 20)'})
+        self.assertEqual(
+            list(AuditLog.objects.order_by('id').values_list('action', 'old_marks', 'new_marks')),
+            [('CREATE', None, 70), ('UPDATE', 70, 90)],
+        )
+
+
+class ImportStudentsTests(PortalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rebuild_subject_stats()
+
+    def import_csv(self, text):
+        return importer.import_students_csv(io.StringIO('name,subject,marks\n' + text), self.teacher)
+
+    def test_marks_are_added_and_capped(self):
+        Student.objects.create(name='Asha', subject=self.subject, marks=70)
+        rebuild_subject_stats()
+
+        summary = self.import_csv('Asha,Mathematics,20\nAsha,Mathematics,20\nBela,Mathematics,50\n')
+
+        self.assertEqual((summary['created'], summary['updated']), (1, 1))
+        self.assertEqual(dict(Student.objects.values_list('name', 'marks')), {'Asha': 100, 'Bela': 50})
+        self.assertEqual(find_stats_drift(), {})
+
+    def test_student_inserted_concurrently_is_merged_not_overwritten(self):
+        lock_students = importer._lock_students
+
+        def insert_after_the_read(names, subject_ids):
+            locked = lock_students(names, subject_ids)
+            if not Student.objects.filter(name='Asha').exists():
+                Student.objects.create(name='Asha', subject=self.subject, marks=40)
+                apply_marks_changes([(self.subject.id, None, 40)])
+            return locked
+
+        with mock.patch.object(importer, '_lock_students', side_effect=insert_after_the_read):
+            summary = self.import_csv('Asha,Mathematics,30\n')
+
+        self.assertEqual((summary['created'], summary['updated']), (0, 1))
+        self.assertEqual(Student.objects.get(name='Asha').marks, 70)
+        entry = AuditLog.objects.get()
+        self.assertEqual((entry.action, entry.old_marks, entry.new_marks), ('UPDATE', 40, 70))
+        self.assertEqual(find_stats_drift(), {})
+
+
+class UpdateMarksBatchTests(PortalTestCase):
+
+    def test_partial_failures(self):
+        asha = Student.objects.create(name='Asha', subject=self.subject, marks=40)
+        bela = Student.objects.create(name='Bela', subject=self.subject, marks=60)
+
+        response = self.post_json('/api/update-marks/batch/', {'updates': [
+            {'student_id': asha.id, 'marks': 70},
+            {'student_id': bela.id, 'marks': 150},
+            {'student_id': 999999, 'marks': 10},
+            {'marks': 5},
+            {'student_id': 'x', 'marks': 5},
+            [asha.id, 5],
+            {'student_id': [asha.id], 'marks': 5},
+        ]})
+
+        self.assertTrue(response['success'])
+        self.assertEqual([result['success'] for result in response['results']], [True] + [False] * 6)
+        self.assertEqual(
+            [result['error'] for result in response['results'][1:]],
+            ['Marks must be between 0 and 100', 'Student not found', 'Missing required fields',
+             'Invalid student ID', 'Each update must be an object', 'Invalid student ID'],
+        )
+
+        asha.refresh_from_db()
+        bela.refresh_from_db()
+        self.assertEqual((asha.marks, bela.marks), (70, 60))
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+    def test_malformed_bodies_are_rejected(self):
+        for body, error in (
+            ([{'student_id': 1, 'marks': 5}], 'The request body must be a JSON object'),
+            ('not json', 'The request body must be a JSON object'),
+            ({'updates': {'student_id': 1, 'marks': 5}}, 'updates must be a list'),
+        ):
+            content = body if isinstance(body, str) else json.dumps(body)
+            response = self.client.post('/api/update-marks/batch/', content, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'success': False, 'error': error})
+
+    def test_later_edit_of_a_student_wins(self):
+        asha = Student.objects.create(name='Asha', subject=self.subject, marks=40)
+
+        response = self.post_json('/api/update-marks/batch/', {'updates': [
+            {'student_id': asha.id, 'marks': 50},
+            {'student_id': asha.id, 'marks': 55},
+        ]})
+
+        self.assertEqual([result['new_marks'] for result in response['results']], [55, 55])
+        asha.refresh_from_db()
+        self.assertEqual(asha.marks, 55)
+
+    def test_batch_size_limit(self):
+        with override_settings(PORTAL_MAX_BATCH_SIZE=1):
+            response = self.post_json('/api/update-marks/batch/', {'updates': [
+                {'student_id': 1, 'marks': 1}, {'student_id': 2, 'marks': 1},
+            ]})
+        self.assertFalse(response['success'])
+
+
+class SubjectStatsTests(PortalTestCase):
+
+    def assertNoDrift(self):
+        self.assertEqual(find_stats_drift(), {})
+
+    def test_stats_follow_every_write(self):
+        asha = self.add('Asha', 45)['student_id']
+        self.add('Bela', 90)
+        self.add('Chen', 30, subject='Physics')
+        self.assertNoDrift()
+
+        self.add('Asha', 70)
+        self.assertNoDrift()
+
+        self.post_json('/api/update-marks/', {'student_id': asha, 'marks': 10})
+        self.assertNoDrift()
+
+        bela = Student.objects.get(name='Bela').id
+        self.post_json('/api/update-marks/batch/', {'updates': [
+            {'student_id': asha, 'marks': 100}, {'student_id': bela, 'marks': 0},
+        ]})
+        self.assertNoDrift()
+
+        self.post_json('/api/delete-student/', {'student_id': bela})
+        self.assertNoDrift()
+
+        chen = Student.objects.get(name='Chen').id
+        self.post_json('/api/delete-student/', {'student_id': chen})
+        self.assertNoDrift()
+
+    def test_stats_api(self):
+        self.add('Asha', 40)
+        self.add('Bela', 80)
+
+        stats = self.client.get('/api/stats/subjects/').json()
+        mathematics = next(row for row in stats['subjects'] if row['subject'] == 'Mathematics')
+        self.assertEqual((mathematics['count'], mathematics['min'], mathematics['max']), (2, 40, 80))
+        self.assertEqual(mathematics['mean'], 60)
+
+
+@override_settings(AUTH_TOKEN_MODE='signed', AUTH_REVOCATION_SYNC_SECONDS=0)
+class SignedTokenTests(PortalTestCase):
+
+    def setUp(self):
+        # The caches are process-wide; start each test without them
+        self._reset_auth_caches()
+        self.addCleanup(self._reset_auth_caches)
+        super().setUp()
+
+    def _reset_auth_caches(self):
+        auth._revocations = None
+        auth._teachers = None
+
+    def client_with_cookie(self, value):
+        client = self.client_class()
+        client.cookies[AUTH_COOKIE_NAME] = value
+        return client
+
+    def test_login_sets_a_signed_cookie_instead_of_a_session(self):
+        self.assertIn(AUTH_COOKIE_NAME, self.client.cookies)
+        self.assertNotIn('auth_token', self.client.session)
+        self.assertEqual(self.client.get('/api/students/').status_code, 200)
+
+    def test_tampered_cookie_is_rejected(self):
+        value = self.client.cookies[AUTH_COOKIE_NAME].value
+        response = self.client_with_cookie(value[:-2] + 'xx').get('/api/students/')
+        self.assertRedirects(response, '/login/', fetch_redirect_response=False)
+
+    def test_logout_revokes_the_cookie(self):
+        stolen = self.client_with_cookie(self.client.cookies[AUTH_COOKIE_NAME].value)
+        self.assertEqual(stolen.get('/api/students/').status_code, 200)
+
+        self.client.get('/logout/')
+
+        self.assertRedirects(stolen.get('/api/students/'), '/login/', fetch_redirect_response=False)
+        self.assertFalse(SessionToken.objects.get().is_active)
+
+    def test_revocation_elsewhere_is_picked_up_at_the_next_sync(self):
+        SessionToken.objects.update(is_active=False)
+        response = self.client.get('/api/students/')
+        self.assertRedirects(response, '/login/', fetch_redirect_response=False)
+
+    def test_deleted_teacher_is_not_served_from_the_cache(self):
+        self.assertEqual(self.client.get('/api/students/').status_code, 200)
+
+        self.teacher.delete()
+
+        self.assertRedirects(self.client.get('/api/students/'), '/login/', fetch_redirect_response=False)
+
+    def test_expired_cookie_is_rejected(self):
+        later = time.time() + SESSION_TOKEN_LIFETIME.total_seconds() + 60
+        with mock.patch('django.core.signing.time') as fake_time:
+            fake_time.time.return_value = later
+            response = self.client.get('/api/students/')
+        self.assertRedirects(response, '/login/', fetch_redirect_response=False)
+
+    def test_deleted_teacher_is_logged_out(self):
+        self.teacher.delete()
+        response = self.client.get('/api/students/')
+        self.assertRedirects(response, '/login/', fetch_redirect_response=False)
+
+
+class AsyncMarksApiTests(PortalTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.async_client.cookies = self.client.cookies
+        self.student = Student.objects.create(name='Asha', subject=self.subject, marks=40)
+        rebuild_subject_stats()
+        self.real_write = views._write_marks_update
+
+    async def post_async(self, path, data):
+        response = await self.async_client.post(path, json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def concurrent_update(self, student, marks):
+        """What another writer's committed update leaves behind"""
+        Student.objects.filter(id=student.id).update(marks=marks)
+        apply_marks_changes([(student.subject_id, student.marks, marks)])
+
+    def change_marks_first(self, times):
+        """Stand-in for _write_marks_update that lets another writer change the marks first, `times` times"""
+        calls = []
+
+        def write(teacher, ip_address, student, new_marks):
+            calls.append(student.marks)
+            if len(calls) <= times:
+                self.concurrent_update(student, student.marks + 1)
+            return self.real_write(teacher, ip_address, student, new_marks)
+
+        return write, calls
+
+    async def test_update_add_delete(self):
+        response = await self.post_async('/api/async/update-marks/', {'student_id': self.student.id, 'marks': 75})
+        self.assertTrue(response['success'])
+
+        response = await self.post_async('/api/async/add-student/', {'name': 'Asha', 'subject': 'Mathematics', 'marks': 20})
+        self.assertEqual((response['old_marks'], response['new_marks']), (75, 95))
+
+        response = await self.post_async('/api/async/add-student/', {'name': 'Asha', 'subject': 'Mathematics', 'marks': 10})
+        self.assertEqual(response, {'success': False, 'error': 'Total marks would exceed 100 (current: 95, adding: 10)'})
+
+        response = await self.post_async('/api/async/delete-student/', {'student_id': self.student.id})
+        self.assertTrue(response['success'])
+        self.assertFalse(await Student.objects.filter(id=self.student.id).aexists())
+        self.assertEqual(await sync_to_async(find_stats_drift)(), {})
+
+    async def test_missing_student_and_method(self):
+        response = await self.post_async('/api/async/update-marks/', {'student_id': 999999, 'marks': 10})
+        self.assertEqual(response, {'success': False, 'error': 'No Student matches the given query.'})
+        self.assertEqual((await self.async_client.get('/api/async/update-marks/')).status_code, 405)
+
+    async def test_concurrent_change_is_retried_with_fresh_marks(self):
+        write, calls = self.change_marks_first(times=1)
+        with mock.patch.object(views, '_write_marks_update', side_effect=write):
+            response = await self.post_async('/api/async/update-marks/', {'student_id': self.student.id, 'marks': 90})
+
+        self.assertTrue(response['success'])
+        # The second attempt read the marks the other writer left
+        self.assertEqual(calls, [40, 41])
+        entry = await AuditLog.objects.aget()
+        self.assertEqual((entry.old_marks, entry.new_marks), (41, 90))
+        self.assertEqual(await sync_to_async(find_stats_drift)(), {})
+
+    async def test_gives_up_after_repeated_concurrent_changes(self):
+        write, calls = self.change_marks_first(times=views.CONCURRENT_WRITE_ATTEMPTS)
+        with mock.patch.object(views, '_write_marks_update', side_effect=write):
+            response = await self.post_async('/api/async/update-marks/', {'student_id': self.student.id, 'marks': 90})
+
+        self.assertFalse(response['success'])
+        self.assertEqual(len(calls), views.CONCURRENT_WRITE_ATTEMPTS)
+        self.assertFalse(await AuditLog.objects.aexists())
+
+    async def test_delete_is_retried_after_a_concurrent_change(self):
+        calls = []
+        real_delete = views._write_student_deletion
+
+        def delete(teacher, ip_address, student):
+            calls.append(student.marks)
+            if len(calls) == 1:
+                self.concurrent_update(student, 55)
+            return real_delete(teacher, ip_address, student)
+
+        with mock.patch.object(views, '_write_student_deletion', side_effect=delete):
+            response = await self.post_async('/api/async/delete-student/', {'student_id': self.student.id})
+
+        self.assertTrue(response['success'])
+        self.assertEqual(calls, [40, 55])
+        entry = await AuditLog.objects.aget()
+        self.assertEqual((entry.action, entry.old_marks), ('DELETE', 55))
+        self.assertEqual(await sync_to_async(find_stats_drift)(), {})
+
+
+class StaticAssetTests(SimpleTestCase):
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        content = b'console.log("portal");\n' * 50
+        (Path(root.name) / 'main.js').write_bytes(content)
+        (Path(root.name) / 'main.js.gz').write_bytes(gzip.compress(content))
+        override = override_settings(STATIC_ROOT=root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def get(self, path, **headers):
+        response = views.static_asset(RequestFactory().get(f'/static/{path}', headers=headers), path)
+        self.addCleanup(response.close)
+        return response
+
+    def test_accepted_variant_is_served_with_its_encoding(self):
+        response = self.get('main.js', accept_encoding='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/javascript')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertNotIn('Content-Encoding', self.get('main.js'))
+
+    def test_variants_are_not_served_directly(self):
+        with self.assertRaises(Http404):
+            self.get('main.js.gz')
@@ -5,7 +5,20 @@ urlpatterns = [
     path('', views.home_view, name='home'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
+    path('metrics', views.metrics_view, name='metrics'),
+    path('api/students/', views.student_list_api, name='student_list_api'),
+    path('api/events/students/', views.student_events, name='student_events'),
     path('api/update-marks/', views.update_marks, name='update_marks'),
+    path('api/update-marks/batch/', views.update_marks_batch, name='update_marks_batch'),
     path('api/delete-student/', views.delete_student, name='delete_student'),
     path('api/add-student/', views.add_student, name='add_student'),
+    path('api/async/update-marks/', views.update_marks_async, name='update_marks_async'),
+    path('api/async/delete-student/', views.delete_student_async, name='delete_student_async'),
+    path('api/async/add-student/', views.add_student_async, name='add_student_async'),
+    path('api/import-students/', views.import_students, name='import_students'),
+    path('api/export/students/', views.export_students, name='export_students'),
+    path('api/search/students/', views.student_search_api, name='student_search_api'),
+    path('api/stats/subjects/', views.subject_stats_api, name='subject_stats_api'),
+    path('api/audit-log/', views.audit_log_api, name='audit_log_api'),
+    path('api/export/audit-log/', views.export_audit_log, name='export_audit_log'),
 ]
\ No newline at end of file
@@ -1,26 +1,69 @@
+import base64
+import binascii
+import json
 import secrets
-from datetime import datetime, timedelta
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Q
 from django.utils import timezone
-from .models import SessionToken, AuditLog
+from django.utils.dateparse import parse_date
+from .models import SessionToken, Subject, Student, StudentDeletion, AuditLog
+from .audit import get_audit_buffer
+
+KeysetPage = namedtuple('KeysetPage', ['items', 'next_cursor', 'previous_cursor'])
+
+class CursorEncoder(DjangoJSONEncoder):
+    """JSON encoder that keeps full microsecond precision for datetimes, unlike DjangoJSONEncoder"""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
 
 def generate_session_token():
     """Generate a secure random session token"""
     return secrets.token_urlsafe(64)
 
+SESSION_TOKEN_LIFETIME = timedelta(hours=24)
+
 def create_session_token(teacher):
-    """Create a new session token for teacher"""
-    # Clean up old tokens
-    SessionToken.objects.filter(teacher=teacher).delete()
-    
+    """Create and return a new session token for teacher"""
+    # Expired tokens are removed by purge_session_tokens, not on the login path
     token = generate_session_token()
-    expires_at = timezone.now() + timedelta(hours=24)  # 24 hour session
+    expires_at = timezone.now() + SESSION_TOKEN_LIFETIME
     
     session_token = SessionToken.objects.create(
         teacher=teacher,
         token=token,
         expires_at=expires_at
     )
-    return token
+    return session_token
+
+def purge_session_tokens(batch_size=1000, max_batches=None):
+    """
+    Delete expired and deactivated session tokens in batches of batch_size,
+    stopping after max_batches batches if given. Returns the number deleted.
+    With signed auth tokens, deactivated rows are the revocation list, so they
+    are kept until they expire.
+    """
+    now = timezone.now()
+    deleted = 0
+    batches = 0
+    conditions = [Q(expires_at__lte=now)]
+    if settings.AUTH_TOKEN_MODE != 'signed':
+        conditions.append(Q(is_active=False))
+    for condition in conditions:
+        while max_batches is None or batches < max_batches:
+            ids = list(SessionToken.objects.filter(condition).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted += SessionToken.objects.filter(id__in=ids).delete()[0]
+            batches += 1
+    return deleted
 
 def calculate_new_marks(existing_marks, new_marks):
     """
@@ -30,18 +73,115 @@ def calculate_new_marks(existing_marks, new_marks):
     total = existing_marks + new_marks
     return min(total, 100)
 
-def log_audit_action(teacher, action, student_name, subject, old_marks=None, new_marks=None, ip_address=None):
-    """Log user actions for audit trail"""
-    AuditLog.objects.create(
+def build_audit_entry(teacher, action, student_name, subject_id, old_marks=None, new_marks=None, ip_address=None,
+                      student_id=None):
+    """Build an unsaved audit entry"""
+    return AuditLog(
         teacher=teacher,
         action=action,
+        student_id=student_id,
         student_name=student_name,
-        subject=subject,
+        subject_id=subject_id,
         old_marks=old_marks,
         new_marks=new_marks,
         ip_address=ip_address or '127.0.0.1'
     )
 
+def get_subject_ids(names):
+    """Map subject names to Subject ids, creating the subjects that do not exist yet"""
+    names = set(names)
+    subject_ids = dict(Subject.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = names - subject_ids.keys()
+    if missing:
+        # ignore_conflicts: a concurrent request may create the same subject
+        Subject.objects.bulk_create([Subject(name=name) for name in missing], ignore_conflicts=True)
+        subject_ids.update(Subject.objects.filter(name__in=missing).values_list('name', 'id'))
+    return subject_ids
+
+def add_student_marks(name, subject_id, marks):
+    """
+    Insert a student, or add marks to the existing (name, subject_id) row, in a single
+    INSERT ... ON CONFLICT DO UPDATE statement so concurrent adds cannot lose updates.
+    Returns (student_id, old_marks, new_marks) from RETURNING, with old_marks None for a
+    new student, or None when the addition would take the total over 100 and nothing
+    was written.
+    """
+    table = connection.ops.quote_name(Student._meta.db_table)
+    stamp = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (name, subject_id, marks, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (name, subject_id) DO UPDATE
+                SET marks = {table}.marks + excluded.marks, updated_at = excluded.updated_at
+                WHERE {table}.marks + excluded.marks <= 100
+            RETURNING id, marks, created_at
+            """,
+            [name, subject_id, marks, stamp, stamp],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    student_id, new_marks, created_at = row
+    # An update keeps the row's original created_at; only the inserted row carries this stamp
+    if connection.ops.adapt_datetimefield_value(created_at) == stamp:
+        return student_id, None, new_marks
+    return student_id, new_marks - marks, new_marks
+
+def student_deletion_cutoff():
+    """Tombstones older than this are purged; sync cursors older than it must reload"""
+    return timezone.now() - timedelta(days=settings.STUDENT_DELETION_RETENTION_DAYS)
+
+def purge_student_deletions(batch_size=1000, max_batches=None):
+    """
+    Delete tombstones older than STUDENT_DELETION_RETENTION_DAYS in batches of
+    batch_size, stopping after max_batches batches if given. Returns the number deleted.
+    """
+    cutoff = student_deletion_cutoff()
+    deleted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = list(StudentDeletion.objects.filter(deleted_at__lt=cutoff).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        deleted += StudentDeletion.objects.filter(id__in=ids).delete()[0]
+        batches += 1
+    return deleted
+
+def record_student_deletions(student_ids):
+    """Leave tombstones for deleted students so delta sync clients learn about them"""
+    StudentDeletion.objects.bulk_create([StudentDeletion(student_id=student_id) for student_id in student_ids])
+
+def serialize_student(student):
+    """JSON-ready representation of a student row (select_related('subject') to avoid a query per row)"""
+    return {
+        'id': student.id,
+        'name': student.name,
+        'subject': student.subject.name,
+        'subject_id': student.subject_id,
+        'marks': student.marks,
+        'updated_at': student.updated_at.isoformat(),
+    }
+
+def log_audit_action(teacher, action, student_name, subject_id, old_marks=None, new_marks=None, ip_address=None,
+                     student_id=None):
+    """Log user actions for audit trail"""
+    log_audit_actions([
+        build_audit_entry(teacher, action, student_name, subject_id, old_marks, new_marks, ip_address, student_id)
+    ])
+
+def log_audit_actions(entries):
+    """
+    Log many audit entries built with build_audit_entry in a single insert.
+    In buffered mode they are queued once the surrounding transaction commits.
+    """
+    if settings.AUDIT_LOG_MODE == 'buffered':
+        buffer = get_audit_buffer()
+        transaction.on_commit(lambda: buffer.put(entries))
+    else:
+        AuditLog.objects.bulk_create(entries)
+
 def get_client_ip(request):
     """Extract client IP address from request"""
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -57,4 +197,128 @@ def validate_marks(marks):
         marks_int = int(marks)
         return 0 <= marks_int <= 100
     except (ValueError, TypeError):
-        return False
\ No newline at end of file
+        return False
+
+def get_page_size(request, param='per_page'):
+    """Read the requested page size, clamped to the configured maximum"""
+    try:
+        page_size = int(request.GET.get(param, settings.PORTAL_PAGE_SIZE))
+    except (ValueError, TypeError):
+        page_size = settings.PORTAL_PAGE_SIZE
+    return max(1, min(page_size, settings.PORTAL_MAX_PAGE_SIZE))
+
+def encode_cursor(values):
+    """Encode keyset pagination values into an opaque URL-safe cursor"""
+    raw = json.dumps(list(values), cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, size, fields=None):
+    """
+    Decode a cursor produced by encode_cursor, returning None if it is malformed.
+    With fields (one model field per value) the values are converted to the fields'
+    Python types, and a value that does not convert makes the cursor malformed too.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    if fields is not None:
+        try:
+            values = [field.to_python(value) for field, value in zip(fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            return None
+        # Keyset columns are never null; the ORM refuses None as a comparison value
+        if None in values:
+            return None
+    return values
+
+def prefix_filter(field, prefix):
+    """
+    Match values starting with prefix as a range condition.
+    Unlike startswith (LIKE) this can be answered by a plain index range scan.
+    """
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + '\U0010ffff'})
+
+def keyset_filter(fields, values, descending=False):
+    """
+    Build the "row comes after (values)" condition for an ordering on fields.
+    The leading column gets an extra range bound so the database can seek the index.
+    """
+    lookup = 'lt' if descending else 'gt'
+    condition = Q()
+    for index, field in enumerate(fields):
+        clause = Q(**{f'{field}__{lookup}': values[index]})
+        for previous_field, previous_value in zip(fields[:index], values[:index]):
+            clause &= Q(**{previous_field: previous_value})
+        condition |= clause
+    return Q(**{f'{fields[0]}__{lookup}e': values[0]}) & condition
+
+def paginate_keyset(queryset, fields, after=None, before=None, page_size=50, descending=False):
+    """
+    Keyset (cursor) pagination over queryset ordered by fields.
+    Each page is a single index seek, so page N costs the same as page 1.
+    """
+    ordering = [f'-{field}' if descending else field for field in fields]
+    reverse_ordering = [field if descending else f'-{field}' for field in fields]
+
+    model_fields = [queryset.model._meta.get_field(field) for field in fields]
+    before_values = decode_cursor(before, len(fields), model_fields)
+    after_values = decode_cursor(after, len(fields), model_fields)
+
+    if before_values is not None:
+        rows = list(
+            queryset.filter(keyset_filter(fields, before_values, not descending))
+            .order_by(*reverse_ordering)[:page_size + 1]
+        )
+        has_more = len(rows) > page_size
+        items = rows[:page_size][::-1]
+        next_cursor = _row_cursor(items[-1], fields) if items else None
+        previous_cursor = _row_cursor(items[0], fields) if has_more and items else None
+        return KeysetPage(items, next_cursor, previous_cursor)
+
+    if after_values is not None:
+        queryset = queryset.filter(keyset_filter(fields, after_values, descending))
+    rows = list(queryset.order_by(*ordering)[:page_size + 1])
+    items = rows[:page_size]
+    next_cursor = _row_cursor(items[-1], fields) if len(rows) > page_size else None
+    previous_cursor = _row_cursor(items[0], fields) if after_values is not None and items else None
+    return KeysetPage(items, next_cursor, previous_cursor)
+
+def _row_cursor(row, fields):
+    return encode_cursor(getattr(row, field) for field in fields)
+
+def parse_date_range(request, start_param='date_from', end_param='date_to'):
+    """
+    Read an inclusive YYYY-MM-DD date range from the query string as aware datetimes.
+    Returns (start, end) where end is exclusive; either may be None. Raises ValueError on bad input.
+    """
+    bounds = []
+    for param in (start_param, end_param):
+        value = request.GET.get(param, '').strip()
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValueError(f'{param} must be a date in YYYY-MM-DD format')
+        bounds.append(timezone.make_aware(datetime.combine(day, time.min)))
+    start, end = bounds
+    if end is not None:
+        end += timedelta(days=1)
+    return start, end
+
+def filter_datetime_range(queryset, field, start=None, end=None):
+    """Restrict queryset to start <= field < end using plain comparisons the index can serve"""
+    if start is not None:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{field}__lt': end})
+    return queryset
\ No newline at end of file
@@ -1,13 +1,44 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotAllowed, HttpResponseNotModified, JsonResponse, StreamingHttpResponse, FileResponse, Http404
 from django.views.decorators.csrf import csrf_protect
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, condition
 from django.contrib import messages
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from django.utils.http import http_date
+from asgiref.sync import sync_to_async
+from django.utils._os import safe_join
+from django.views.static import was_modified_since
 from django.db import transaction
-from django.core.exceptions import ValidationError
+from django.db.models import Exists, Max, OuterRef
+from django.core.exceptions import SuspiciousFileOperation, ValidationError
+import os
+import hashlib
+import logging
+import io
 import json
-from .models import Teacher, Student, AuditLog,SessionToken
-from .utils import create_session_token, calculate_new_marks, log_audit_action, get_client_ip, validate_marks
+from datetime import timedelta
+from .models import Teacher, Student, StudentDeletion, SubjectStats, AuditLog,SessionToken
+from .importer import import_students_csv
+from .events import get_broker, publish_student_event, stream_events
+from .stats import apply_marks_changes, serialize_subject_stats
+from .search import search_students
+from .caching import bump_student_data_version, get_or_render_student_table
+from .metrics import get_metrics_registry, metrics_token_matches
+from .routers import read_from_replica
+from .auth import AUTH_COOKIE_NAME, get_revocation_set, set_auth_cookie, unsign_auth_token
+from .staticfiles import is_static_variant, select_static_variant, static_cache_control, static_content_type
+from .exporter import STUDENT_EXPORT_COLUMNS, AUDIT_LOG_EXPORT_COLUMNS, CONTENT_TYPES, stream_export
+from .utils import (
+    create_session_token, log_audit_action, get_client_ip, validate_marks,
+    build_audit_entry, log_audit_actions, get_subject_ids, add_student_marks, record_student_deletions, student_deletion_cutoff, serialize_student, get_page_size, paginate_keyset, prefix_filter,
+    parse_date_range, filter_datetime_range, encode_cursor, decode_cursor,
+)
+
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 
@@ -35,9 +66,13 @@ def login_view(request):
         teacher = Teacher.objects.get(username=username)
         if teacher.check_password(password):
             # Create session token
-            token = create_session_token(teacher)
-            request.session['auth_token'] = token
-            return redirect('home')
+            session_token = create_session_token(teacher)
+            response = redirect('home')
+            if settings.AUTH_TOKEN_MODE == 'signed':
+                set_auth_cookie(response, session_token)
+            else:
+                request.session['auth_token'] = session_token.token
+            return response
         else:
             messages.error(request, 'Invalid credentials')
     except Teacher.DoesNotExist:
@@ -45,17 +80,186 @@ def login_view(request):
     
     return render(request, 'portal/login.html')
 
+def _filtered_students(request):
+    """Students matching the subject and name-prefix filters of the dashboard"""
+    students = Student.objects.select_related('subject')
+    subject = request.GET.get('subject', '').strip()
+    name_prefix = request.GET.get('q', '').strip()
+    if subject:
+        students = students.filter(subject__name=subject)
+    if name_prefix:
+        students = students.filter(prefix_filter('name', name_prefix))
+    return students
+
+def _paginate_students(request, students):
+    # Ordered on (name, subject_id) so every page is a seek on the unique_together index
+    return paginate_keyset(
+        students,
+        ['name', 'subject_id'],
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=get_page_size(request),
+    )
+
+@read_from_replica
 def home_view(request):
-    """Display student list with inline editing capabilities"""
-    students = Student.objects.all().order_by('name', 'subject')
-    return render(request, 'portal/home.html', {'students': students})
+    """Display a keyset-paginated, filterable student list with inline editing capabilities"""
+    subject_filter = request.GET.get('subject', '').strip()
+    name_filter = request.GET.get('q', '').strip()
+    page_size = get_page_size(request)
+    
+    def page_query(**cursor):
+        query = request.GET.copy()
+        query.pop('after', None)
+        query.pop('before', None)
+        query.update(cursor)
+        return query.urlencode()
+    
+    def render_table():
+        # Only runs on a cache miss; the table markup holds no per-teacher content
+        sync_cursor = encode_cursor([timezone.now()])
+        page = _paginate_students(request, _filtered_students(request))
+        return render_to_string('portal/student_table.html', {
+            'students': page.items,
+            'subject_filter': subject_filter,
+            'name_filter': name_filter,
+            'next_query': page_query(after=page.next_cursor) if page.next_cursor else None,
+            'previous_query': page_query(before=page.previous_cursor) if page.previous_cursor else None,
+            'first_query': page_query() if page.previous_cursor else None,
+            'sync_cursor': sync_cursor,
+            'batch_size': settings.PORTAL_MAX_BATCH_SIZE,
+        })
+    
+    # "Show all" mode renders an empty virtual-scrolling table that main.js fills
+    # window by window from the student list API
+    show_all = request.GET.get('view') == 'all'
+    view_query = request.GET.copy()
+    for param in ('after', 'before', 'per_page', 'view'):
+        view_query.pop(param, None)
+    if not show_all:
+        view_query['view'] = 'all'
+    
+    student_table = None
+    if not show_all:
+        table_params = {
+            'subject': subject_filter,
+            'q': name_filter,
+            'per_page': page_size,
+            'after': request.GET.get('after', ''),
+            'before': request.GET.get('before', ''),
+        }
+        student_table = mark_safe(get_or_render_student_table(table_params, render_table))
+    
+    return render(request, 'portal/home.html', {
+        'student_table': student_table,
+        'show_all': show_all,
+        'toggle_view_query': view_query.urlencode(),
+        'virtual_window_size': settings.PORTAL_MAX_PAGE_SIZE,
+        'batch_size': settings.PORTAL_MAX_BATCH_SIZE,
+        'subject_filter': subject_filter,
+        'name_filter': name_filter,
+        'page_size': page_size,
+        'page_size_choices': [size for size in (25, 50, 100, 200) if size <= settings.PORTAL_MAX_PAGE_SIZE],
+    })
+
+def _students_etag(request):
+    """
+    Version of the student list: the latest change and the latest tombstone, both
+    index-only MAX lookups read from the same database as the list itself
+    """
+    latest = Student.objects.aggregate(latest=Max('updated_at'))['latest']
+    last_deletion = StudentDeletion.objects.aggregate(last=Max('id'))['last']
+    version = f"{latest.isoformat() if latest else ''}:{last_deletion}:{request.GET.urlencode()}"
+    return hashlib.md5(version.encode()).hexdigest()
+
+@read_from_replica
+@require_http_methods(["GET"])
+@condition(etag_func=_students_etag)
+def student_list_api(request):
+    """
+    JSON student list with ETag support. With ?since=<sync_cursor> it returns only
+    the rows changed and the ids deleted since that cursor was issued.
+    """
+    try:
+        # Taken before querying, so changes committed meanwhile are picked up next time
+        sync_cursor = encode_cursor([timezone.now()])
+        
+        since = request.GET.get('since')
+        if since is None:
+            page = _paginate_students(request, _filtered_students(request))
+            return JsonResponse({
+                'success': True,
+                'students': [serialize_student(student) for student in page.items],
+                'next_cursor': page.next_cursor,
+                'previous_cursor': page.previous_cursor,
+                'sync_cursor': sync_cursor,
+            })
+        
+        values = decode_cursor(since, 1, [Student._meta.get_field('updated_at')])
+        if values is None:
+            return JsonResponse({'success': False, 'error': 'Invalid sync cursor'})
+        
+        # Overlap the window slightly: updated_at is stamped before commit, so a row
+        # can become visible after a cursor later than its timestamp was issued
+        changed_after = values[0] - timedelta(seconds=settings.STUDENT_SYNC_OVERLAP_SECONDS)
+        if changed_after < student_deletion_cutoff():
+            # Tombstones from that far back may have been purged
+            return JsonResponse({'success': True, 'reset': True, 'sync_cursor': sync_cursor})
+        
+        changed = _filtered_students(request).filter(updated_at__gte=changed_after).order_by('updated_at', 'id')
+        limit = settings.PORTAL_MAX_PAGE_SIZE
+        rows = list(changed[:limit + 1])
+        deleted = list(
+            StudentDeletion.objects.filter(deleted_at__gte=changed_after).values_list('student_id', flat=True)[:limit + 1]
+        )
+        
+        if len(rows) > limit or len(deleted) > limit:
+            # Too many changes to ship in one response; the client should reload the list
+            return JsonResponse({'success': True, 'reset': True, 'sync_cursor': sync_cursor})
+        
+        return JsonResponse({
+            'success': True,
+            'changed': [serialize_student(student) for student in rows],
+            'deleted': deleted,
+            'sync_cursor': sync_cursor,
+        })
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+def _json_object(request):
+    """The request body parsed as a JSON object, or None if it is not one"""
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+def _invalid_body():
+    return JsonResponse({'success': False, 'error': 'The request body must be a JSON object'}, status=400)
+
+def _is_integer_like(value):
+    """An id sent as a JSON integer or a string of digits (not a bool, float or container)"""
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return True
+    if not isinstance(value, str):
+        return False
+    try:
+        int(value)
+    except ValueError:
+        return False
+    return True
 
 @csrf_protect
 @require_http_methods(["POST"])
 def update_marks(request):
     """Handle inline marks updates with validation and audit logging"""
     try:
-        data = json.loads(request.body)
+        data = _json_object(request)
+        if data is None:
+            return _invalid_body()
         student_id = data.get('student_id')
         new_marks = data.get('marks')
         
@@ -67,7 +271,7 @@ def update_marks(request):
             return JsonResponse({'success': False, 'error': 'Marks must be between 0 and 100'})
         
         with transaction.atomic():
-            student = get_object_or_404(Student, id=student_id)
+            student = get_object_or_404(Student.objects.select_related('subject'), id=student_id)
             old_marks = student.marks
             student.marks = int(new_marks)
             student.save()
@@ -77,29 +281,132 @@ def update_marks(request):
                 teacher=request.user,
                 action='UPDATE',
                 student_name=student.name,
-                subject=student.subject,
+                subject_id=student.subject_id,
                 old_marks=old_marks,
                 new_marks=student.marks,
-                ip_address=get_client_ip(request)
+                ip_address=get_client_ip(request),
+                student_id=student.id
             )
+            apply_marks_changes([(student.subject_id, old_marks, student.marks)])
+            publish_student_event('update', serialize_student(student))
+            bump_student_data_version()
         
         return JsonResponse({'success': True, 'message': 'Marks updated successfully'})
     
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+@csrf_protect
+@require_http_methods(["POST"])
+def update_marks_batch(request):
+    """Apply many inline marks updates in one transaction with a bulk update and a bulk audit insert"""
+    try:
+        data = _json_object(request)
+        if data is None:
+            return _invalid_body()
+        updates = data.get('updates')
+        
+        if not isinstance(updates, list):
+            return JsonResponse({'success': False, 'error': 'updates must be a list'}, status=400)
+        
+        if not updates:
+            return JsonResponse({'success': False, 'error': 'A non-empty list of updates is required'})
+        
+        if len(updates) > settings.PORTAL_MAX_BATCH_SIZE:
+            return JsonResponse({
+                'success': False,
+                'error': f'At most {settings.PORTAL_MAX_BATCH_SIZE} updates are allowed per batch'
+            })
+        
+        results = [None] * len(updates)
+        # student_id -> (positions in the request, marks); a later edit of the same student wins
+        pending = {}
+        for index, item in enumerate(updates):
+            if not isinstance(item, dict):
+                results[index] = {'student_id': None, 'success': False, 'error': 'Each update must be an object'}
+                continue
+            
+            student_id = item.get('student_id')
+            new_marks = item.get('marks')
+            
+            if not student_id or new_marks is None:
+                results[index] = {'student_id': student_id, 'success': False, 'error': 'Missing required fields'}
+                continue
+            
+            if not validate_marks(new_marks):
+                results[index] = {'student_id': student_id, 'success': False, 'error': 'Marks must be between 0 and 100'}
+                continue
+            
+            if not _is_integer_like(student_id):
+                results[index] = {'student_id': student_id, 'success': False, 'error': 'Invalid student ID'}
+                continue
+            student_id = int(student_id)
+            
+            indices = pending[student_id][0] if student_id in pending else []
+            pending[student_id] = (indices + [index], int(new_marks))
+        
+        ip_address = get_client_ip(request)
+        with transaction.atomic():
+            students = Student.objects.select_related('subject').select_for_update(of=('self',)).in_bulk(list(pending))
+            now = timezone.now()
+            changed = []
+            audit_entries = []
+            
+            for student_id, (indices, new_marks) in pending.items():
+                student = students.get(student_id)
+                if student is None:
+                    result = {'student_id': student_id, 'success': False, 'error': 'Student not found'}
+                else:
+                    old_marks = student.marks
+                    student.marks = new_marks
+                    student.updated_at = now
+                    changed.append(student)
+                    audit_entries.append(build_audit_entry(
+                        teacher=request.user,
+                        action='UPDATE',
+                        student_name=student.name,
+                        subject_id=student.subject_id,
+                        old_marks=old_marks,
+                        new_marks=new_marks,
+                        ip_address=ip_address,
+                        student_id=student.id
+                    ))
+                    publish_student_event('update', serialize_student(student))
+                    result = {'student_id': student_id, 'success': True, 'old_marks': old_marks, 'new_marks': new_marks}
+                
+                for index in indices:
+                    results[index] = result
+            
+            Student.objects.bulk_update(changed, ['marks', 'updated_at'])
+            log_audit_actions(audit_entries)
+            apply_marks_changes(
+                (entry.subject_id, entry.old_marks, entry.new_marks) for entry in audit_entries
+            )
+            if changed:
+                bump_student_data_version()
+        
+        return JsonResponse({
+            'success': True,
+            'message': f'Updated marks for {len(changed)} student(s)',
+            'results': results
+        })
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
 @csrf_protect
 @require_http_methods(["POST"])
 def delete_student(request):
     """Handle inline student deletion with audit logging"""
     try:
-        data = json.loads(request.body)
+        data = _json_object(request)
+        if data is None:
+            return _invalid_body()
         student_id = data.get('student_id')
         
         if not student_id:
             return JsonResponse({'success': False, 'error': 'Student ID required'})
         
-        print(request.user)
         with transaction.atomic():
             student = get_object_or_404(Student, id=student_id)
             
@@ -108,17 +415,22 @@ def delete_student(request):
                 teacher=request.user,
                 action='DELETE',
                 student_name=student.name,
-                subject=student.subject,
+                subject_id=student.subject_id,
                 old_marks=student.marks,
-                ip_address=get_client_ip(request)
+                ip_address=get_client_ip(request),
+                student_id=student.id
             )
             
+            record_student_deletions([student.id])
+            publish_student_event('delete', {'id': student.id})
             student.delete()
+            apply_marks_changes([(student.subject_id, student.marks, None)])
+            bump_student_data_version()
         
         return JsonResponse({'success': True, 'message': 'Student deleted successfully'})
     
     except Exception as e:
-        print("---------------------",e)
+        logger.exception('Deleting a student failed')
         return JsonResponse({'success': False, 'error': str(e)})
 
 @csrf_protect
@@ -126,80 +438,461 @@ def delete_student(request):
 def add_student(request):
     """Handle new student addition with duplicate checking and business logic"""
     try:
-        data = json.loads(request.body)
-        name = data.get('name', '').strip()
-        subject = data.get('subject', '').strip()
-        marks = data.get('marks')
+        data = _json_object(request)
+        if data is None:
+            return _invalid_body()
+        error, name, subject, marks = _parse_new_student(data)
+        if error:
+            return JsonResponse({'success': False, 'error': error})
         
-        # Input validation
-        if not name or not subject:
-            return JsonResponse({'success': False, 'error': 'Name and subject are required'})
+        result = _write_student_addition(request.user, get_client_ip(request), name, subject, marks)
+        if result is None:
+            current = Student.objects.filter(name=name, subject__name=subject).values_list('marks', flat=True).first()
+            return JsonResponse(_marks_limit_error(current, marks))
+        return JsonResponse(_student_added(*result))
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+def _parse_new_student(data):
+    """(error, name, subject, marks) from an add-student request body"""
+    name = data.get('name', '')
+    subject = data.get('subject', '')
+    marks = data.get('marks')
+    
+    if not isinstance(name, str) or not isinstance(subject, str):
+        return 'Name and subject must be strings', None, None, None
+    name = name.strip()
+    subject = subject.strip()
+    
+    # Input validation
+    if not name or not subject:
+        return 'Name and subject are required', None, None, None
+    
+    if not validate_marks(marks):
+        return 'Marks must be between 0 and 100', None, None, None
+    
+    # Sanitize inputs to prevent XSS
+    return None, name[:100], subject[:100], int(marks)
+
+def _write_student_addition(teacher, ip_address, name, subject, marks):
+    """
+    Insert a student or add to their marks, with the audit entry, subject stats and event,
+    in one transaction. Returns (student_id, old_marks, new_marks), or None when the total
+    would exceed 100.
+    """
+    with transaction.atomic():
+        subject_id = get_subject_ids([subject])[subject]
+        # Insert, or add to the existing marks, in one statement
+        result = add_student_marks(name, subject_id, marks)
+        if result is None:
+            return None
+        
+        student_id, old_marks, new_marks = result
+        apply_marks_changes([(subject_id, old_marks, new_marks)])
+        bump_student_data_version()
+        publish_student_event('create' if old_marks is None else 'update', {
+            'id': student_id,
+            'name': name,
+            'subject': subject,
+            'subject_id': subject_id,
+            'marks': new_marks,
+        })
+        log_audit_action(
+            teacher=teacher,
+            action='CREATE' if old_marks is None else 'UPDATE',
+            student_name=name,
+            subject_id=subject_id,
+            old_marks=old_marks,
+            new_marks=new_marks,
+            ip_address=ip_address,
+            student_id=student_id
+        )
+    return result
+
+def _marks_limit_error(current, marks):
+    return {'success': False, 'error': f'Total marks would exceed 100 (current: {current}, adding: {marks})'}
+
+def _student_added(student_id, old_marks, new_marks):
+    if old_marks is None:
+        message = 'Student added successfully'
+    else:
+        message = f'Updated existing student. Marks increased from {old_marks} to {new_marks}'
+    return {
+        'success': True,
+        'message': message,
+        'student_id': student_id,
+        'old_marks': old_marks,
+        'new_marks': new_marks
+    }
+
+# Async (ASGI) versions of the marks APIs, with the same request and response
+# formats. Django 4.2 has no async transactions, so the student is read with
+# the async ORM and the write, with its audit entry, stats and event, runs as
+# one short transaction through sync_to_async. The write only applies if the
+# marks are still the ones read; otherwise the student is read again, so the
+# audit entry and stats delta never use stale marks.
+# csrf_protect and require_http_methods are not async-aware in Django 4.2;
+# CsrfViewMiddleware checks these POSTs and the method is checked inline.
+
+CONCURRENT_WRITE_ATTEMPTS = 3
+
+async def update_marks_async(request):
+    """Async update_marks"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        data = _json_object(request)
+        if data is None:
+            return _invalid_body()
+        student_id = data.get('student_id')
+        new_marks = data.get('marks')
+        
+        if not student_id or new_marks is None:
+            return JsonResponse({'success': False, 'error': 'Missing required fields'})
         
-        if not validate_marks(marks):
+        if not validate_marks(new_marks):
             return JsonResponse({'success': False, 'error': 'Marks must be between 0 and 100'})
         
-        # Sanitize inputs to prevent XSS
-        name = name[:100]  # Limit length
-        subject = subject[:100]
-        marks = int(marks)
+        ip_address = get_client_ip(request)
+        for _ in range(CONCURRENT_WRITE_ATTEMPTS):
+            student = await _aget_student(Student.objects.select_related('subject'), student_id)
+            if await sync_to_async(_write_marks_update)(request.user, ip_address, student, int(new_marks)):
+                return JsonResponse({'success': True, 'message': 'Marks updated successfully'})
+        return JsonResponse({'success': False, 'error': 'The student was changed concurrently, please try again'})
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+async def delete_student_async(request):
+    """Async delete_student"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        data = _json_object(request)
+        if data is None:
+            return _invalid_body()
+        student_id = data.get('student_id')
         
-        with transaction.atomic():
-            # Check if student with same name and subject exists
-            try:
-                existing_student = Student.objects.get(name=name, subject=subject)
-                # Apply business logic for existing student
-                old_marks = existing_student.marks
-                new_marks = calculate_new_marks(existing_student.marks, marks)
-                
-                if new_marks > 100:
-                    return JsonResponse({
-                        'success': False, 
-                        'error': f'Total marks would exceed 100 (current: {old_marks}, adding: {marks})'
-                    })
-                
-                print(new_marks,"--------------------")
-                existing_student.marks = new_marks
-                existing_student.save()
-                
-                log_audit_action(
-                    teacher=request.user,
-                    action='UPDATE',
-                    student_name=name,
-                    subject=subject,
-                    old_marks=old_marks,
-                    new_marks=new_marks,
-                    ip_address=get_client_ip(request)
-                )
-                
-                return JsonResponse({
-                    'success': True, 
-                    'message': f'Updated existing student. Marks increased from {old_marks} to {new_marks}'
-                })
-                
-            except Student.DoesNotExist:
-                # Create new student
-                student = Student.objects.create(
-                    name=name,
-                    subject=subject,
-                    marks=marks
-                )
-                
-                log_audit_action(
-                    teacher=request.user,
-                    action='CREATE',
-                    student_name=name,
-                    subject=subject,
-                    new_marks=marks,
-                    ip_address=get_client_ip(request)
-                )
-                
-                return JsonResponse({'success': True, 'message': 'Student added successfully'})
+        if not student_id:
+            return JsonResponse({'success': False, 'error': 'Student ID required'})
+        
+        ip_address = get_client_ip(request)
+        for _ in range(CONCURRENT_WRITE_ATTEMPTS):
+            student = await _aget_student(Student.objects.all(), student_id)
+            if await sync_to_async(_write_student_deletion)(request.user, ip_address, student):
+                return JsonResponse({'success': True, 'message': 'Student deleted successfully'})
+        return JsonResponse({'success': False, 'error': 'The student was changed concurrently, please try again'})
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+async def add_student_async(request):
+    """Async add_student"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        data = _json_object(request)
+        if data is None:
+            return _invalid_body()
+        error, name, subject, marks = _parse_new_student(data)
+        if error:
+            return JsonResponse({'success': False, 'error': error})
+        
+        # The insert-or-add is a single statement already; only its bookkeeping needs the transaction
+        result = await sync_to_async(_write_student_addition)(
+            request.user, get_client_ip(request), name, subject, marks
+        )
+        if result is None:
+            current = await Student.objects.filter(
+                name=name, subject__name=subject
+            ).values_list('marks', flat=True).afirst()
+            return JsonResponse(_marks_limit_error(current, marks))
+        return JsonResponse(_student_added(*result))
     
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+async def _aget_student(queryset, student_id):
+    try:
+        return await queryset.aget(id=student_id)
+    except Student.DoesNotExist:
+        raise Http404('No Student matches the given query.')
+
+def _write_marks_update(teacher, ip_address, student, new_marks):
+    """Set the marks of a student read earlier; False if their marks changed (or they were deleted) since"""
+    old_marks = student.marks
+    now = timezone.now()
+    with transaction.atomic():
+        if not Student.objects.filter(id=student.id, marks=old_marks).update(marks=new_marks, updated_at=now):
+            return False
+        student.marks = new_marks
+        student.updated_at = now
+        log_audit_action(
+            teacher=teacher,
+            action='UPDATE',
+            student_name=student.name,
+            subject_id=student.subject_id,
+            old_marks=old_marks,
+            new_marks=new_marks,
+            ip_address=ip_address,
+            student_id=student.id
+        )
+        apply_marks_changes([(student.subject_id, old_marks, new_marks)])
+        publish_student_event('update', serialize_student(student))
+        bump_student_data_version()
+    return True
+
+def _write_student_deletion(teacher, ip_address, student):
+    """Delete a student read earlier; False if their marks changed (or they were deleted) since"""
+    with transaction.atomic():
+        deleted, _ = Student.objects.filter(id=student.id, marks=student.marks).delete()
+        if not deleted:
+            return False
+        log_audit_action(
+            teacher=teacher,
+            action='DELETE',
+            student_name=student.name,
+            subject_id=student.subject_id,
+            old_marks=student.marks,
+            ip_address=ip_address,
+            student_id=student.id
+        )
+        record_student_deletions([student.id])
+        publish_student_event('delete', {'id': student.id})
+        apply_marks_changes([(student.subject_id, student.marks, None)])
+        bump_student_data_version()
+    return True
+
+@csrf_protect
+@require_http_methods(["POST"])
+def import_students(request):
+    """Stream an uploaded CSV of students into the table with chunked upserts and bulk audit logging"""
+    try:
+        upload = request.FILES.get('file')
+        if not upload:
+            return JsonResponse({'success': False, 'error': 'A CSV file is required'})
+        
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        summary = import_students_csv(stream, request.user, ip_address=get_client_ip(request))
+        
+        return JsonResponse({
+            'success': True,
+            'message': f"Imported {summary['created']} new and {summary['updated']} existing student(s)",
+            **summary
+        })
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+@read_from_replica
+@require_http_methods(["GET"])
+def export_students(request):
+    """Stream students as CSV or JSON lines, filtered by subject, update date and teacher"""
+    try:
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in CONTENT_TYPES:
+            return JsonResponse({'success': False, 'error': 'Format must be csv or jsonl'})
+        
+        start, end = parse_date_range(request)
+        students = filter_datetime_range(Student.objects.order_by('name', 'subject_id'), 'updated_at', start, end)
+        
+        subject = request.GET.get('subject', '').strip()
+        if subject:
+            students = students.filter(subject__name=subject)
+        
+        # Students whose marks the given teacher has changed
+        teacher = request.GET.get('teacher', '').strip()
+        if teacher:
+            students = students.filter(Exists(AuditLog.objects.filter(
+                teacher__username=teacher,
+                student_id=OuterRef('id'),
+            )))
+        
+        return _export_response(students, STUDENT_EXPORT_COLUMNS, export_format, 'students')
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+@read_from_replica
+@require_http_methods(["GET"])
+def export_audit_log(request):
+    """Stream audit log entries as CSV or JSON lines, filtered by subject, date and teacher"""
+    try:
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in CONTENT_TYPES:
+            return JsonResponse({'success': False, 'error': 'Format must be csv or jsonl'})
+        
+        start, end = parse_date_range(request)
+        entries = filter_datetime_range(AuditLog.objects.order_by('id'), 'timestamp', start, end)
+        
+        subject = request.GET.get('subject', '').strip()
+        if subject:
+            entries = entries.filter(subject__name=subject)
+        
+        teacher = request.GET.get('teacher', '').strip()
+        if teacher:
+            entries = entries.filter(teacher__username=teacher)
+        
+        return _export_response(entries, AUDIT_LOG_EXPORT_COLUMNS, export_format, 'audit-log')
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+def _export_response(queryset, columns, export_format, basename):
+    response = StreamingHttpResponse(
+        stream_export(queryset, columns, export_format),
+        content_type=f'{CONTENT_TYPES[export_format]}; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{basename}.{export_format}"'
+    return response
+
+@read_from_replica
+@require_http_methods(["GET"])
+def audit_log_api(request):
+    """Browse the audit log newest first with keyset pagination on (timestamp, id)"""
+    try:
+        start, end = parse_date_range(request)
+        entries = filter_datetime_range(AuditLog.objects.select_related('teacher', 'subject'), 'timestamp', start, end)
+        
+        teacher = request.GET.get('teacher', '').strip()
+        if teacher:
+            entries = entries.filter(teacher__username=teacher)
+        
+        student_name = request.GET.get('student_name', '').strip()
+        subject = request.GET.get('subject', '').strip()
+        if student_name:
+            entries = entries.filter(student_name=student_name)
+        if subject:
+            entries = entries.filter(subject__name=subject)
+        
+        action = request.GET.get('action', '').strip().upper()
+        if action:
+            entries = entries.filter(action=action)
+        
+        page = paginate_keyset(
+            entries,
+            ['timestamp', 'id'],
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            page_size=get_page_size(request),
+            descending=True,
+        )
+        
+        return JsonResponse({
+            'success': True,
+            'entries': [{
+                'id': entry.id,
+                'teacher': entry.teacher.username,
+                'action': entry.action,
+                'student_id': entry.student_id,
+                'student_name': entry.student_name,
+                'subject': entry.subject.name,
+                'old_marks': entry.old_marks,
+                'new_marks': entry.new_marks,
+                'timestamp': entry.timestamp.isoformat(),
+                'ip_address': entry.ip_address,
+            } for entry in page.items],
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        })
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+async def student_events(request):
+    """Server-Sent Events stream of student create/update/delete events (needs the ASGI server)"""
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'success': False, 'error': 'Live updates require the ASGI server'}, status=501)
+    
+    broker = get_broker()
+    response = StreamingHttpResponse(
+        stream_events(broker.subscribe(), broker),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@read_from_replica
+@require_http_methods(["GET"])
+def student_search_api(request):
+    """As-you-type student search on name and subject, tolerant of prefixes and typos"""
+    try:
+        limit = min(get_page_size(request, 'limit'), 50)
+        students = search_students(request.GET.get('q', ''), limit=limit)
+        return JsonResponse({'success': True, 'students': [serialize_student(student) for student in students]})
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """Prometheus metrics for this process; requires 'Authorization: Bearer <METRICS_TOKEN>'"""
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    if not metrics_token_matches(request):
+        response = HttpResponse('Unauthorized', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(get_metrics_registry().render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@require_http_methods(["GET", "HEAD"])
+def static_asset(request, path):
+    """
+    Serve a collected static file from STATIC_ROOT, picking the precompressed
+    .br or .gz variant the client accepts. Hashed names are cached as immutable.
+    """
+    # Served directly, a variant would reach the client without its Content-Encoding
+    if is_static_variant(path):
+        raise Http404
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    
+    stat = os.stat(full_path)
+    cache_control = static_cache_control(path)
+    if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        response = HttpResponseNotModified()
+        response['Cache-Control'] = cache_control
+        return response
+    
+    file_path, encoding, has_variants = select_static_variant(request, full_path)
+    response = FileResponse(open(file_path, 'rb'), content_type=static_content_type(path))
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if has_variants:
+        response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = cache_control
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
+
+@read_from_replica
+@require_http_methods(["GET"])
+def subject_stats_api(request):
+    """Per-subject count, mean, min, max and pass rate from the incrementally maintained summary"""
+    return JsonResponse({
+        'success': True,
+        'pass_marks': settings.PORTAL_PASS_MARKS,
+        'subjects': [
+            serialize_subject_stats(stats)
+            for stats in SubjectStats.objects.select_related('subject').order_by('subject__name')
+        ],
+    })
+
 def logout_view(request):
     """Handle user logout and session cleanup"""
+    if settings.AUTH_TOKEN_MODE == 'signed':
+        # The signed cookie stays valid until it expires, so deactivate its token
+        # row (the revocation list) instead of deleting it
+        claims = unsign_auth_token(request.COOKIES.get(AUTH_COOKIE_NAME))
+        if claims:
+            SessionToken.objects.filter(id=claims[1]).update(is_active=False)
+            get_revocation_set().add(claims[1])
+    
     # Clean up session token
     session_token = request.session.get('auth_token')
     if session_token:
@@ -209,14 +902,15 @@ def logout_view(request):
             pass
     
     request.session.flush()
-    return redirect('login')
+    response = redirect('login')
+    response.delete_cookie(AUTH_COOKIE_NAME, samesite='Lax')
+    return response
 
 
 
-from portal.models import Teacher, Student
+from portal.models import Teacher, Subject, Student
 
 def create_sample_data():
-    print("------------------------------")
     """Create sample data for testing"""
     
     # Create a sample teacher if it doesn't exist
@@ -224,7 +918,7 @@ def create_sample_data():
         teacher = Teacher(username='teacher1')
         teacher.set_password('password123')
         teacher.save()
-        print("Created teacher: teacher1 / password123")
+        logger.info('Created teacher: teacher1 / password123')
     
     # Create sample students
     sample_students = [
@@ -241,15 +935,11 @@ def create_sample_data():
     for student_data in sample_students:
         student, created = Student.objects.get_or_create(
             name=student_data['name'],
-            subject=student_data['subject'],
+            subject=Subject.objects.get_or_create(name=student_data['subject'])[0],
             defaults={'marks': student_data['marks']}
         )
         if created:
-            print(f"Created student: {student.name} - {student.subject} ({student.marks})")
-
-
-# create_sample_data()
-print("Sample data creation completed!")
+            logger.info('Created student: %s - %s (%s)', student.name, student.subject, student.marks)
 
 
-# print(SessionToken.objects.all().last().is_active,"---------------") 
\ No newline at end of file
+# create_sample_data() 
\ No newline at end of file
@@ -45,6 +45,730 @@ function showToast(message, type = 'info') {
     bsToast.show();
 }
 
+let studentRowTemplate = null;
+
+// Build a student table row matching the server-rendered markup
+function createStudentRow(student) {
+    if (!studentRowTemplate) {
+        // Parsed once; every row after that is a cheap clone
+        studentRowTemplate = document.createElement('tr');
+        studentRowTemplate.innerHTML = `
+            <td class="student-name"></td>
+            <td class="student-subject"></td>
+            <td>
+                <div class="d-flex align-items-center">
+                    <span class="marks-display"></span>
+                    <input type="number" class="form-control marks-input d-none" 
+                           min="0" max="100" style="width: 80px;">
+                    <button class="btn btn-sm btn-outline-primary ms-2 edit-marks-btn">
+                        <i class="fas fa-edit"></i>
+                    </button>
+                    <button class="btn btn-sm btn-success ms-1 save-marks-btn d-none">
+                        <i class="fas fa-check"></i>
+                    </button>
+                    <button class="btn btn-sm btn-secondary ms-1 cancel-marks-btn d-none">
+                        <i class="fas fa-times"></i>
+                    </button>
+                    <span class="save-status ms-2"></span>
+                </div>
+            </td>
+            <td>
+                <button class="btn btn-sm btn-danger delete-student-btn">
+                    <i class="fas fa-trash"></i>
+                </button>
+            </td>
+        `;
+    }
+    const row = studentRowTemplate.cloneNode(true);
+    row.dataset.studentId = student.id;
+    row.querySelector('.student-name').textContent = student.name;
+    row.querySelector('.student-subject').textContent = student.subject;
+    row.querySelector('.marks-display').textContent = student.marks;
+    row.querySelector('.marks-input').value = student.marks;
+    
+    const deleteBtn = row.querySelector('.delete-student-btn');
+    deleteBtn.dataset.studentId = student.id;
+    deleteBtn.dataset.studentName = student.name;
+    deleteBtn.dataset.subject = student.subject;
+    deleteBtn.dataset.subjectId = student.subject_id;
+    return row;
+}
+
+function emptyTableRow() {
+    return `
+        <tr>
+            <td colspan="4" class="text-center text-muted py-4">
+                <i class="fas fa-users fa-2x mb-2"></i><br>
+                No students found. Add your first student!
+            </td>
+        </tr>
+    `;
+}
+
+// Same (name, subject_id) ordering as the server, which compares names code point by code point
+function compareStudentKeys(a, b) {
+    if (a.name !== b.name) return a.name < b.name ? -1 : 1;
+    return Number(a.subject_id) - Number(b.subject_id);
+}
+
+function rowKey(row) {
+    const deleteBtn = row.querySelector('.delete-student-btn');
+    return { name: deleteBtn.dataset.studentName, subject_id: deleteBtn.dataset.subjectId };
+}
+
+// Patch the visible page with rows changed or deleted elsewhere
+function applyStudentChanges(table, changed, deleted) {
+    // Marks edited here but not saved yet win over what the server last sent
+    const pending = table.pendingEdits;
+    if (pending) {
+        changed = changed.map(student => {
+            if (!pending.has(student.id)) return student;
+            pending.noteServerMarks(student.id, student.marks);
+            return { ...student, marks: pending.marksFor(student.id) };
+        });
+    }
+    
+    if (table.virtualList) {
+        table.virtualList.applyChanges(changed, deleted);
+        return;
+    }
+    
+    const tbody = table.querySelector('tbody');
+    
+    deleted.forEach(id => {
+        const row = tbody.querySelector(`tr[data-student-id="${id}"]`);
+        if (row) row.remove();
+    });
+    
+    changed.forEach(student => {
+        const existing = tbody.querySelector(`tr[data-student-id="${student.id}"]`);
+        if (existing) {
+            const marksInput = existing.querySelector('.marks-input');
+            existing.querySelector('.marks-display').textContent = student.marks;
+            // Leave a row that is being edited alone
+            if (marksInput.classList.contains('d-none')) {
+                marksInput.value = student.marks;
+            }
+            return;
+        }
+        
+        const rows = Array.from(tbody.querySelectorAll('tr[data-student-id]'));
+        const before = rows.find(row => compareStudentKeys(student, rowKey(row)) < 0);
+        // Rows sorting outside the visible page belong to another page
+        if (rows.length && !before && table.dataset.hasNext) return;
+        if (rows.length && before === rows[0] && table.dataset.hasPrevious) return;
+        
+        if (!rows.length) tbody.innerHTML = '';
+        tbody.insertBefore(createStudentRow(student), before || null);
+    });
+    
+    if (!tbody.children.length) {
+        tbody.innerHTML = emptyTableRow();
+    }
+}
+
+// Fetch only what changed since the last sync (honouring the page filters) and apply it
+function syncStudents() {
+    const table = document.getElementById('studentsTable');
+    if (!table || !table.dataset.syncCursor) return Promise.resolve();
+    
+    const params = new URLSearchParams(window.location.search);
+    const query = new URLSearchParams({ since: table.dataset.syncCursor });
+    ['q', 'subject'].forEach(name => {
+        if (params.get(name)) query.set(name, params.get(name));
+    });
+    
+    return fetch(`/api/students/?${query}`, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.error);
+            }
+            if (data.reset) {
+                window.location.reload();
+                return;
+            }
+            applyStudentChanges(table, data.changed, data.deleted);
+            table.dataset.syncCursor = data.sync_cursor;
+        });
+}
+
+// Rows rendered above and below the visible slice, so short scrolls need no re-render
+const VIRTUAL_OVERSCAN = 10;
+// Fetch the next window once the visible slice gets this close to the last loaded row
+const VIRTUAL_PREFETCH_ROWS = 50;
+
+function spacerRow(height) {
+    const row = document.createElement('tr');
+    row.className = 'virtual-spacer';
+    const cell = document.createElement('td');
+    cell.colSpan = 4;
+    cell.style.height = `${height}px`;
+    row.appendChild(cell);
+    return row;
+}
+
+/*
+ * "Show all" mode: rows are fetched from the student list API one keyset window
+ * at a time as the list is scrolled, kept as plain objects, and only the slice
+ * in view (plus VIRTUAL_OVERSCAN rows either side) is in the DOM.
+ */
+function createVirtualStudentList(table, scroller, status) {
+    const tbody = table.querySelector('tbody');
+    const windowSize = Number(table.dataset.windowSize) || 200;
+    const students = [];
+    // Student id -> marks typed so far, so an edit survives its row being scrolled away
+    const drafts = new Map();
+    let nextCursor = null;
+    let complete = false;
+    let loading = null;
+    let rowHeight = 0;
+    let rendered = null;
+    let frame = null;
+    let forceRender = false;
+    
+    function indexOf(id) {
+        return students.findIndex(student => student.id === Number(id));
+    }
+    
+    function load() {
+        if (loading || complete) return loading || Promise.resolve();
+        
+        const params = new URLSearchParams(window.location.search);
+        const query = new URLSearchParams({ per_page: windowSize });
+        ['q', 'subject'].forEach(name => {
+            if (params.get(name)) query.set(name, params.get(name));
+        });
+        if (nextCursor) query.set('after', nextCursor);
+        
+        loading = fetch(`/api/students/?${query}`, { headers: { 'Accept': 'application/json' } })
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) {
+                    throw new Error(data.error);
+                }
+                // The first window's cursor is the oldest, so syncing from it misses nothing
+                if (!table.dataset.syncCursor) table.dataset.syncCursor = data.sync_cursor;
+                data.students.forEach(student => students.push(student));
+                nextCursor = data.next_cursor;
+                complete = !nextCursor;
+                scheduleRender(true);
+            })
+            .finally(() => {
+                loading = null;
+            });
+        return loading;
+    }
+    
+    function renderRow(student) {
+        const row = createStudentRow(student);
+        if (table.pendingEdits) setRowSaveStatus(row, table.pendingEdits.statusOf(student.id));
+        if (drafts.has(student.id)) {
+            row.querySelector('.marks-input').value = drafts.get(student.id);
+            setRowEditing(row, true);
+        }
+        return row;
+    }
+    
+    function render() {
+        frame = null;
+        const force = forceRender;
+        forceRender = false;
+        
+        if (!students.length) {
+            rendered = null;
+            tbody.innerHTML = complete ? emptyTableRow() : '';
+            status.textContent = complete ? '' : 'Loading students...';
+            return;
+        }
+        
+        if (!rowHeight) {
+            const probe = tbody.appendChild(createStudentRow(students[0]));
+            rowHeight = probe.offsetHeight || 49;
+            probe.remove();
+        }
+        
+        const first = Math.max(Math.floor(scroller.scrollTop / rowHeight) - VIRTUAL_OVERSCAN, 0);
+        const last = Math.min(first + Math.ceil(scroller.clientHeight / rowHeight) + 2 * VIRTUAL_OVERSCAN, students.length);
+        
+        if (force || !rendered || rendered[0] !== first || rendered[1] !== last) {
+            // Keep the caret in a marks input that is being typed into
+            const focused = tbody.contains(document.activeElement) && document.activeElement.classList.contains('marks-input')
+                ? document.activeElement.closest('tr').dataset.studentId : null;
+            
+            const fragment = document.createDocumentFragment();
+            fragment.appendChild(spacerRow(first * rowHeight));
+            for (let i = first; i < last; i++) {
+                fragment.appendChild(renderRow(students[i]));
+            }
+            fragment.appendChild(spacerRow((students.length - last) * rowHeight));
+            tbody.replaceChildren(fragment);
+            rendered = [first, last];
+            
+            if (focused) {
+                const row = tbody.querySelector(`tr[data-student-id="${focused}"]`);
+                if (row) row.querySelector('.marks-input').focus();
+            }
+        }
+        
+        status.textContent = complete
+            ? `${students.length} student(s)`
+            : `${students.length} student(s) loaded, scroll for more`;
+        
+        if (!complete && last + VIRTUAL_PREFETCH_ROWS >= students.length) {
+            load().catch(error => console.error('Error:', error));
+        }
+    }
+    
+    function scheduleRender(force) {
+        forceRender = forceRender || force;
+        if (!frame) frame = requestAnimationFrame(render);
+    }
+    
+    scroller.addEventListener('scroll', () => scheduleRender(false), { passive: true });
+    window.addEventListener('resize', () => scheduleRender(false));
+    
+    return {
+        load: load,
+        
+        // Same contract as applyStudentChanges, applied to the loaded rows
+        applyChanges(changed, deleted) {
+            deleted.forEach(id => {
+                const index = indexOf(id);
+                if (index !== -1) students.splice(index, 1);
+                drafts.delete(Number(id));
+            });
+            
+            changed.forEach(student => {
+                const index = indexOf(student.id);
+                if (index !== -1) {
+                    students[index] = { ...students[index], ...student };
+                    return;
+                }
+                
+                let low = 0;
+                let high = students.length;
+                while (low < high) {
+                    const middle = (low + high) >> 1;
+                    if (compareStudentKeys(students[middle], student) < 0) low = middle + 1;
+                    else high = middle;
+                }
+                // Past the last loaded row it arrives with a later window
+                if (low === students.length && !complete) return;
+                students.splice(low, 0, student);
+            });
+            
+            scheduleRender(true);
+        },
+        
+        setDraft(id, marks) {
+            drafts.set(Number(id), marks);
+        },
+        
+        // Show other marks for a student without touching an edit in progress
+        setMarks(id, marks) {
+            const index = indexOf(id);
+            if (index !== -1) {
+                students[index] = { ...students[index], marks: marks };
+                scheduleRender(true);
+            }
+        },
+        
+        // Leave edit mode for a student, recording its saved marks if given
+        finishEditing(id, marks) {
+            drafts.delete(Number(id));
+            const index = indexOf(id);
+            if (index !== -1 && marks !== undefined) {
+                students[index] = { ...students[index], marks: marks };
+            }
+            scheduleRender(true);
+        }
+    };
+}
+
+// A save the server refused; sending it again would fail the same way
+class SaveRejectedError extends Error {}
+
+// Quiet period after the latest marks edit before the queued edits are sent
+const PENDING_EDIT_DEBOUNCE_MS = 800;
+// Retries after a failed batch wait 1s, 2s, 4s... up to this long
+const PENDING_EDIT_RETRY_MAX_MS = 30000;
+// How long a row shows its "saved" tick
+const SAVED_STATUS_MS = 2000;
+
+const SAVE_STATUS_ICONS = {
+    pending: ['fas fa-clock text-muted', 'Waiting to save'],
+    saving: ['spinner-border spinner-border-sm text-primary', 'Saving...'],
+    retrying: ['fas fa-redo text-warning', 'Saving failed, retrying'],
+    saved: ['fas fa-check-circle text-success', 'Saved'],
+    error: ['fas fa-exclamation-circle text-danger', 'Not saved']
+};
+
+function setRowSaveStatus(row, status) {
+    const indicator = row.querySelector('.save-status');
+    if (!indicator) return;
+    indicator.innerHTML = '';
+    if (!status) return;
+    
+    const [className, label] = SAVE_STATUS_ICONS[status.state];
+    const icon = document.createElement('span');
+    icon.className = className;
+    icon.title = status.message || label;
+    icon.setAttribute('role', 'status');
+    icon.setAttribute('aria-label', icon.title);
+    indicator.appendChild(icon);
+}
+
+/*
+ * Inline marks saves are queued instead of sent one by one: repeated edits of
+ * a student collapse to the latest value, and once editing pauses for
+ * PENDING_EDIT_DEBOUNCE_MS everything queued goes to the batch API in one
+ * request (one transaction and one audit insert on the server). Requests
+ * that fail on the network or with a server error are retried with exponential
+ * backoff; one request is in flight at a time. Edits the server refuses are
+ * not retried: their rows go back to the marks the server last had.
+ */
+function createPendingEdits(table) {
+    const batchSize = Number(table.dataset.batchSize) || 100;
+    const queued = new Map();       // student id -> marks waiting to be sent
+    const inFlight = new Map();     // student id -> marks in the request being sent
+    const statuses = new Map();     // student id -> { state, message }
+    const serverMarks = new Map();  // student id -> marks on the server while edits are unsaved
+    let timer = null;
+    let sending = false;
+    let failures = 0;
+    
+    function setStatus(id, status) {
+        if (status) statuses.set(id, status);
+        else statuses.delete(id);
+        const row = table.querySelector(`tr[data-student-id="${id}"]`);
+        if (row) setRowSaveStatus(row, status);
+    }
+    
+    // The server refused the edit: show the marks it still has
+    function reject(id, message) {
+        setStatus(id, { state: 'error', message: message });
+        if (!serverMarks.has(id)) return;
+        const marks = serverMarks.get(id);
+        serverMarks.delete(id);
+        
+        if (table.virtualList) {
+            table.virtualList.setMarks(id, marks);
+            return;
+        }
+        const row = table.querySelector(`tr[data-student-id="${id}"]`);
+        if (!row) return;
+        row.querySelector('.marks-display').textContent = marks;
+        const marksInput = row.querySelector('.marks-input');
+        if (marksInput.classList.contains('d-none')) marksInput.value = marks;
+    }
+    
+    function schedule(delay) {
+        clearTimeout(timer);
+        timer = setTimeout(flush, delay);
+    }
+    
+    function flush(keepalive) {
+        clearTimeout(timer);
+        timer = null;
+        if (sending || !queued.size) return;
+        
+        const batch = Array.from(queued).slice(0, batchSize);
+        batch.forEach(([id, marks]) => {
+            queued.delete(id);
+            inFlight.set(id, marks);
+            setStatus(id, { state: 'saving' });
+        });
+        sending = true;
+        
+        fetch('/api/update-marks/batch/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrftoken
+            },
+            body: JSON.stringify({
+                updates: batch.map(([id, marks]) => ({ student_id: id, marks: marks }))
+            }),
+            // Lets the last batch finish while the page is being closed
+            keepalive: keepalive === true
+        })
+        .then(response => {
+            if (response.redirected) {
+                // Sent to the login page instead of the API
+                throw new SaveRejectedError('Your session has expired, please log in again');
+            }
+            if (response.status >= 500) {
+                throw new Error(`Server responded with ${response.status}`);
+            }
+            if (!response.ok) {
+                throw new SaveRejectedError(`Server responded with ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            if (!data.success) {
+                throw new SaveRejectedError(data.error);
+            }
+            failures = 0;
+            let rejected = 0;
+            
+            data.results.forEach(result => {
+                const id = Number(result.student_id);
+                const sent = inFlight.get(id);
+                inFlight.delete(id);
+                // Edited again meanwhile: the row's status follows the newer edit
+                if (queued.has(id)) {
+                    if (result.success) serverMarks.set(id, sent);
+                    return;
+                }
+                
+                if (result.success) {
+                    serverMarks.delete(id);
+                    setStatus(id, { state: 'saved' });
+                    setTimeout(() => {
+                        const status = statuses.get(id);
+                        if (status && status.state === 'saved') setStatus(id, null);
+                    }, SAVED_STATUS_MS);
+                } else {
+                    // Rejected by the server (e.g. the student was deleted); retrying will not help
+                    rejected += 1;
+                    reject(id, result.error);
+                }
+            });
+            
+            if (rejected) {
+                showToast(`${rejected} marks change(s) could not be saved`, 'error');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            if (error instanceof SaveRejectedError) {
+                // A bad request, a CSRF failure or an expired login fails the same way every time
+                failures = 0;
+                inFlight.forEach((marks, id) => {
+                    if (!queued.has(id)) reject(id, error.message);
+                });
+                showToast(`Marks change(s) could not be saved: ${error.message}`, 'error');
+                return;
+            }
+            failures += 1;
+            // Queue the batch again, unless a student has been edited again since
+            inFlight.forEach((marks, id) => {
+                if (queued.has(id)) return;
+                queued.set(id, marks);
+                setStatus(id, { state: 'retrying', message: `Saving failed (${error.message}), retrying` });
+            });
+        })
+        .finally(() => {
+            inFlight.clear();
+            sending = false;
+            if (!queued.size) return;
+            if (failures) {
+                schedule(Math.min(1000 * 2 ** (failures - 1), PENDING_EDIT_RETRY_MAX_MS));
+            } else {
+                schedule(queued.size >= batchSize ? 0 : PENDING_EDIT_DEBOUNCE_MS);
+            }
+        });
+    }
+    
+    return {
+        flush: flush,
+        
+        // shownMarks: what the row showed before this edit, used if the server refuses it
+        queue(id, marks, shownMarks) {
+            id = Number(id);
+            if (!serverMarks.has(id) && !queued.has(id) && !inFlight.has(id)) {
+                serverMarks.set(id, shownMarks);
+            }
+            queued.set(id, marks);
+            setStatus(id, { state: 'pending' });
+            if (sending) return;  // picked up when the request in flight finishes
+            if (queued.size >= batchSize) {
+                flush();
+            } else if (!failures) {
+                // While backing off, the retry timer stays as it is
+                schedule(PENDING_EDIT_DEBOUNCE_MS);
+            }
+        },
+        
+        has(id) {
+            return queued.has(Number(id)) || inFlight.has(Number(id));
+        },
+        
+        // Marks the server sent for a student with unsaved edits
+        noteServerMarks(id, marks) {
+            if (this.has(id)) serverMarks.set(Number(id), marks);
+        },
+        
+        marksFor(id) {
+            id = Number(id);
+            return queued.has(id) ? queued.get(id) : inFlight.get(id);
+        },
+        
+        statusOf(id) {
+            return statuses.get(Number(id)) || null;
+        },
+        
+        hasUnsaved() {
+            return queued.size > 0 || inFlight.size > 0;
+        }
+    };
+}
+
+// Switch a row between showing its marks and the inline marks editor
+function setRowEditing(row, editing) {
+    row.querySelector('.marks-display').classList.toggle('d-none', editing);
+    row.querySelector('.marks-input').classList.toggle('d-none', !editing);
+    row.querySelector('.edit-marks-btn').classList.toggle('d-none', editing);
+    row.querySelector('.save-marks-btn').classList.toggle('d-none', !editing);
+    row.querySelector('.cancel-marks-btn').classList.toggle('d-none', !editing);
+}
+
+function startEditingRow(table, row) {
+    const marksInput = row.querySelector('.marks-input');
+    setRowEditing(row, true);
+    if (table.virtualList) table.virtualList.setDraft(row.dataset.studentId, marksInput.value);
+    
+    marksInput.focus();
+    marksInput.select();
+}
+
+function cancelEditingRow(table, row) {
+    // Reset input to original value
+    row.querySelector('.marks-input').value = row.querySelector('.marks-display').textContent.trim();
+    setRowEditing(row, false);
+    if (table.virtualList) table.virtualList.finishEditing(row.dataset.studentId);
+}
+
+// Queue a row's edited marks; false when they are invalid
+function saveRowMarks(table, row) {
+    const studentId = row.dataset.studentId;
+    const marksInput = row.querySelector('.marks-input');
+    const newMarks = parseInt(marksInput.value);
+    
+    // Validate marks
+    if (isNaN(newMarks) || newMarks < 0 || newMarks > 100) {
+        showToast('Marks must be between 0 and 100', 'error');
+        marksInput.focus();
+        return false;
+    }
+    
+    // Show the new marks right away; the save goes out with the next batch
+    const shownMarks = parseInt(row.querySelector('.marks-display').textContent);
+    table.pendingEdits.queue(studentId, newMarks, shownMarks);
+    if (table.virtualList) {
+        table.virtualList.finishEditing(studentId, newMarks);
+    } else {
+        row.querySelector('.marks-display').textContent = newMarks;
+        setRowEditing(row, false);
+    }
+    return true;
+}
+
+function matchesPageFilters(student) {
+    const params = new URLSearchParams(window.location.search);
+    const subject = (params.get('subject') || '').trim();
+    const namePrefix = (params.get('q') || '').trim();
+    return (!subject || student.subject === subject) && student.name.startsWith(namePrefix);
+}
+
+// Apply other teachers' changes as they happen (the event stream is served over ASGI)
+function subscribeToStudentEvents(table) {
+    if (!window.EventSource) return;
+    
+    const source = new EventSource('/api/events/students/');
+    let connected = false;
+    
+    source.addEventListener('open', function() {
+        // Catch up on anything missed while reconnecting
+        if (connected) {
+            syncStudents().catch(error => console.error('Error:', error));
+        }
+        connected = true;
+    });
+    
+    source.addEventListener('student', function(e) {
+        const event = JSON.parse(e.data);
+        if (event.type === 'delete') {
+            applyStudentChanges(table, [], [event.student.id]);
+        } else if (matchesPageFilters(event.student)) {
+            applyStudentChanges(table, [event.student], []);
+        }
+    });
+    
+    // Sent when this client fell too far behind; the server closes the stream afterwards
+    source.addEventListener('resync', function() {
+        syncStudents().catch(error => console.error('Error:', error));
+    });
+}
+
+// As-you-type search box; picking a result filters the dashboard to that student
+function setupStudentSearch(input, results) {
+    let timer = null;
+    let controller = null;
+    
+    function hideResults() {
+        results.classList.add('d-none');
+        results.innerHTML = '';
+    }
+    
+    function showResults(students) {
+        results.innerHTML = '';
+        if (!students.length) {
+            const empty = document.createElement('div');
+            empty.className = 'list-group-item small text-muted';
+            empty.textContent = 'No matches';
+            results.appendChild(empty);
+        }
+        students.forEach(student => {
+            const item = document.createElement('a');
+            item.className = 'list-group-item list-group-item-action small';
+            item.href = '/?' + new URLSearchParams({ q: student.name, subject: student.subject });
+            item.textContent = `${student.name} · ${student.subject} (${student.marks})`;
+            results.appendChild(item);
+        });
+        results.classList.remove('d-none');
+    }
+    
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        if (controller) controller.abort();
+        
+        const query = input.value.trim();
+        if (!query) {
+            hideResults();
+            return;
+        }
+        
+        timer = setTimeout(function() {
+            controller = new AbortController();
+            fetch(`/api/search/students/?${new URLSearchParams({ q: query, limit: 10 })}`, {
+                headers: { 'Accept': 'application/json' },
+                signal: controller.signal
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) {
+                    throw new Error(data.error);
+                }
+                showResults(data.students);
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') console.error('Error:', error);
+            });
+        }, 200);
+    });
+    
+    input.addEventListener('keydown', function(e) {
+        if (e.key === 'Escape') hideResults();
+    });
+    
+    document.addEventListener('click', function(e) {
+        if (!results.contains(e.target) && e.target !== input) hideResults();
+    });
+}
+
 // Form validation
 function validateForm(form) {
     let isValid = true;
@@ -100,128 +824,80 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
-    // Inline marks editing
-    const editButtons = document.querySelectorAll('.edit-marks-btn');
-    editButtons.forEach(button => {
-        button.addEventListener('click', function() {
-            const row = this.closest('tr');
-            const marksDisplay = row.querySelector('.marks-display');
-            const marksInput = row.querySelector('.marks-input');
-            const saveBtn = row.querySelector('.save-marks-btn');
-            const cancelBtn = row.querySelector('.cancel-marks-btn');
-            
-            // Hide display, show input and action buttons
-            marksDisplay.classList.add('d-none');
-            marksInput.classList.remove('d-none');
-            this.classList.add('d-none');
-            saveBtn.classList.remove('d-none');
-            cancelBtn.classList.remove('d-none');
-            
-            marksInput.focus();
-            marksInput.select();
+    const studentsTable = document.getElementById('studentsTable');
+    if (studentsTable) {
+        studentsTable.pendingEdits = createPendingEdits(studentsTable);
+        
+        // Send what is queued when the tab is hidden, and warn before leaving with unsaved marks
+        document.addEventListener('visibilitychange', function() {
+            if (document.visibilityState === 'hidden') studentsTable.pendingEdits.flush(true);
         });
-    });
-    
-    // Save marks
-    document.addEventListener('click', function(e) {
-        if (e.target.closest('.save-marks-btn')) {
-            const row = e.target.closest('tr');
-            const studentId = row.dataset.studentId;
-            const marksInput = row.querySelector('.marks-input');
-            const newMarks = parseInt(marksInput.value);
-            
-            // Validate marks
-            if (isNaN(newMarks) || newMarks < 0 || newMarks > 100) {
-                showToast('Marks must be between 0 and 100', 'error');
-                marksInput.focus();
-                return;
+        window.addEventListener('beforeunload', function(e) {
+            if (studentsTable.pendingEdits.hasUnsaved()) {
+                studentsTable.pendingEdits.flush(true);
+                e.preventDefault();
+                e.returnValue = '';
             }
-            
-            // Send update request
-            fetch('/api/update-marks/', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'X-CSRFToken': csrftoken
-                },
-                body: JSON.stringify({
-                    student_id: studentId,
-                    marks: newMarks
-                })
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    const marksDisplay = row.querySelector('.marks-display');
-                    const editBtn = row.querySelector('.edit-marks-btn');
-                    const saveBtn = row.querySelector('.save-marks-btn');
-                    const cancelBtn = row.querySelector('.cancel-marks-btn');
-                    
-                    // Update display
-                    marksDisplay.textContent = newMarks;
-                    
-                    // Reset UI
-                    marksDisplay.classList.remove('d-none');
-                    marksInput.classList.add('d-none');
-                    editBtn.classList.remove('d-none');
-                    saveBtn.classList.add('d-none');
-                    cancelBtn.classList.add('d-none');
-                    
-                    showToast(data.message, 'success');
-                } else {
-                    showToast(data.error, 'error');
-                }
-            })
-            .catch(error => {
+        });
+        
+        if (studentsTable.dataset.virtual) {
+            studentsTable.virtualList = createVirtualStudentList(
+                studentsTable,
+                document.getElementById('virtualStudentScroll'),
+                document.getElementById('virtualStudentStatus')
+            );
+            studentsTable.virtualList.load().catch(error => {
                 console.error('Error:', error);
-                showToast('An error occurred while updating marks', 'error');
+                showToast('An error occurred while loading students', 'error');
             });
         }
-    });
+        subscribeToStudentEvents(studentsTable);
+    }
     
-    // Cancel marks editing
-    document.addEventListener('click', function(e) {
-        if (e.target.closest('.cancel-marks-btn')) {
-            const row = e.target.closest('tr');
-            const marksDisplay = row.querySelector('.marks-display');
-            const marksInput = row.querySelector('.marks-input');
-            const editBtn = row.querySelector('.edit-marks-btn');
-            const saveBtn = row.querySelector('.save-marks-btn');
-            const cancelBtn = row.querySelector('.cancel-marks-btn');
-            
-            // Reset input to original value
-            marksInput.value = marksDisplay.textContent.trim();
-            
-            // Reset UI
-            marksDisplay.classList.remove('d-none');
-            marksInput.classList.add('d-none');
-            editBtn.classList.remove('d-none');
-            saveBtn.classList.add('d-none');
-            cancelBtn.classList.add('d-none');
-        }
-    });
+    const studentSearch = document.getElementById('studentSearch');
+    if (studentSearch) {
+        setupStudentSearch(studentSearch, document.getElementById('studentSearchResults'));
+    }
     
     // Delete student confirmation
-    const deleteButtons = document.querySelectorAll('.delete-student-btn');
     const deleteModal = document.getElementById('deleteConfirmModal');
     const confirmDeleteBtn = document.getElementById('confirmDeleteBtn');
     let studentToDelete = null;
     
-    deleteButtons.forEach(button => {
-        button.addEventListener('click', function() {
-            studentToDelete = {
-                id: this.dataset.studentId,
-                name: this.dataset.studentName,
-                subject: this.dataset.subject
-            };
-            
-            document.getElementById('deleteStudentName').textContent = studentToDelete.name;
-            document.getElementById('deleteSubject').textContent = studentToDelete.subject;
+    // One delegated handler for edit, save, cancel and delete on every row, so
+    // rows added by sync or rendered by the virtual list need no listeners
+    if (studentsTable) {
+        studentsTable.addEventListener('click', function(e) {
+            const button = e.target.closest('.edit-marks-btn, .save-marks-btn, .cancel-marks-btn, .delete-student-btn');
+            if (!button) return;
+            const row = button.closest('tr');
             
-            const modal = new bootstrap.Modal(deleteModal);
-            modal.show();
+            if (button.classList.contains('edit-marks-btn')) {
+                startEditingRow(studentsTable, row);
+            } else if (button.classList.contains('save-marks-btn')) {
+                saveRowMarks(studentsTable, row);
+            } else if (button.classList.contains('cancel-marks-btn')) {
+                cancelEditingRow(studentsTable, row);
+            } else {
+                studentToDelete = {
+                    id: button.dataset.studentId,
+                    name: button.dataset.studentName,
+                    subject: button.dataset.subject
+                };
+                
+                document.getElementById('deleteStudentName').textContent = studentToDelete.name;
+                document.getElementById('deleteSubject').textContent = studentToDelete.subject;
+                
+                bootstrap.Modal.getOrCreateInstance(deleteModal).show();
+            }
         });
-    });
+        
+        studentsTable.addEventListener('input', function(e) {
+            if (studentsTable.virtualList && e.target.classList.contains('marks-input')) {
+                studentsTable.virtualList.setDraft(e.target.closest('tr').dataset.studentId, e.target.value);
+            }
+        });
+    }
     
     if (confirmDeleteBtn) {
         confirmDeleteBtn.addEventListener('click', function() {
@@ -240,30 +916,14 @@ document.addEventListener('DOMContentLoaded', function() {
             .then(response => response.json())
             .then(data => {
                 if (data.success) {
-                    // Remove row from table
-                    const row = document.querySelector(`tr[data-student-id="${studentToDelete.id}"]`);
-                    if (row) {
-                        row.remove();
-                    }
+                    // Remove the row (or the loaded record in "show all" mode)
+                    applyStudentChanges(studentsTable, [], [Number(studentToDelete.id)]);
                     
                     // Hide modal
                     const modal = bootstrap.Modal.getInstance(deleteModal);
                     modal.hide();
                     
                     showToast(data.message, 'success');
-                    
-                    // Check if table is empty
-                    const tbody = document.querySelector('#studentsTable tbody');
-                    if (tbody.children.length === 0) {
-                        tbody.innerHTML = `
-                            <tr>
-                                <td colspan="4" class="text-center text-muted py-4">
-                                    <i class="fas fa-users fa-2x mb-2"></i><br>
-                                    No students found. Add your first student!
-                                </td>
-                            </tr>
-                        `;
-                    }
                 } else {
                     showToast(data.error, 'error');
                 }
@@ -324,10 +984,11 @@ document.addEventListener('DOMContentLoaded', function() {
                     const modal = bootstrap.Modal.getInstance(addStudentModal);
                     modal.hide();
                     
-                    // Reload page to show updated data
-                    setTimeout(() => {
+                    // Patch in just the rows that changed instead of reloading the page
+                    syncStudents().catch(error => {
+                        console.error('Error:', error);
                         window.location.reload();
-                    }, 1000);
+                    });
                 } else {
                     showToast(result.error, 'error');
                 }
@@ -394,5 +1055,20 @@ document.addEventListener('DOMContentLoaded', function() {
             const cancelBtn = e.target.closest('tr').querySelector('.cancel-marks-btn');
             cancelBtn.click();
         }
+        
+        // Tab saves and moves the editor down (Shift+Tab: up) the marks column
+        if (e.key === 'Tab' && e.target.classList.contains('marks-input') && studentsTable) {
+            const row = e.target.closest('tr');
+            let next = e.shiftKey ? row.previousElementSibling : row.nextElementSibling;
+            while (next && !next.dataset.studentId) {
+                next = e.shiftKey ? next.previousElementSibling : next.nextElementSibling;
+            }
+            if (!next) return;
+            
+            e.preventDefault();
+            if (saveRowMarks(studentsTable, row)) {
+                startEditingRow(studentsTable, next);
+            }
+        }
     });
 });
\ No newline at end of file
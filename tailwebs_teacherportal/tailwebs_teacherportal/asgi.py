@@ -2,6 +2,8 @@
 ASGI config for tailwebs_teacherportal project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the portal through this entry point (e.g. ``uvicorn tailwebs_teacherportal.asgi:application``)
+to enable the live student event stream at ``/api/events/students/``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -14,3 +16,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tailwebs_teacherportal.settings')
 
 application = get_asgi_application()
+
+from portal.sweeper import start_session_token_sweeper  # noqa: E402
+
+start_session_token_sweeper()
@@ -12,7 +12,8 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'portal.middleware.MetricsMiddleware',
+    'portal.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -62,8 +65,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Parsed templates are kept in memory; with DEBUG the autoreloader
+            # still clears them when a template file changes
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -80,11 +90,75 @@ WSGI_APPLICATION = 'tailwebs_teacherportal.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DATABASE_PROFILE selects 'sqlite' (default) or 'postgresql' (needs psycopg2).
+# Connections are reused for DB_CONN_MAX_AGE seconds (0 closes them after
+# every request) and health-checked before reuse.
+DATABASE_PROFILE = config('DATABASE_PROFILE', default='sqlite')
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+
+if DATABASE_PROFILE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='teacherportal'),
+            'USER': config('DB_USER', default='teacherportal'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+            },
+        }
+    }
+elif DATABASE_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            # Stock sqlite3 backend plus SQLITE_PRAGMAS and transaction_mode
+            'ENGINE': 'portal.backends.sqlite3',
+            'NAME': config('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Seconds a writer waits for the lock before "database is locked"
+                'timeout': config('SQLITE_BUSY_TIMEOUT', default=20, cast=int),
+                'transaction_mode': config('SQLITE_TRANSACTION_MODE', default='IMMEDIATE'),
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unknown DATABASE_PROFILE '{DATABASE_PROFILE}'")
+
+# Read replicas for the dashboard, listing, search, stats, audit and export views
+# (see portal.routers). DATABASE_REPLICAS lists SQLite file paths for the sqlite
+# profile ('manage.py sync_sqlite_replicas' refreshes them) or hosts sharing the
+# primary's credentials for postgresql. After any write a client reads from the
+# primary for REPLICA_PIN_SECONDS, which should cover the replication lag.
+DATABASE_REPLICAS = config('DATABASE_REPLICAS', default='', cast=Csv())
+DATABASE_REPLICA_ALIASES = []
+for number, replica in enumerate(DATABASE_REPLICAS, start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME' if DATABASE_PROFILE == 'sqlite' else 'HOST': replica,
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICA_ALIASES.append(alias)
+
+DATABASE_ROUTERS = ['portal.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Applied to every new SQLite connection by the portal.backends.sqlite3 backend.
+# WAL lets readers run alongside the single writer; synchronous=NORMAL is safe in
+# WAL mode (a power loss may drop the last commits, never corrupt the file).
+SQLITE_PRAGMAS = {
+    'journal_mode': config('SQLITE_JOURNAL_MODE', default='WAL'),
+    'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=20, cast=int) * 1000,
+    'cache_size': -config('SQLITE_CACHE_SIZE_KB', default=20000, cast=int),
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=134217728, cast=int),
+    'temp_store': 'MEMORY',
 }
 
 
@@ -107,6 +181,11 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Teacher password hashing (PBKDF2-HMAC-SHA256). Changing the iteration count
+# re-hashes each teacher's password on their next successful login.
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=10000, cast=int)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -122,15 +201,139 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
-# STATIC_ROOT = ''
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = config('STATIC_ROOT', default=str(BASE_DIR / 'staticfiles'))
+
+# Static pipeline: collectstatic writes content-hashed copies plus .gz (and, with
+# the optional 'brotli' package, .br) variants into STATIC_ROOT, and the portal
+# serves them itself with Accept-Encoding negotiation. Hashed files are sent as
+# immutable; anything else is cached for STATIC_MAX_AGE seconds. Requires
+# 'manage.py collectstatic' before starting (and 'runserver --nostatic').
+STATIC_PIPELINE = config('STATIC_PIPELINE', default=False, cast=bool)
+STATIC_MAX_AGE = config('STATIC_MAX_AGE', default=60, cast=int)
+if STATIC_PIPELINE:
+    STORAGES = {
+        'default': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        },
+        'staticfiles': {
+            'BACKEND': 'portal.staticfiles.CompressedManifestStaticFilesStorage',
+        },
+    }
 
 # Security settings
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
+# Student list pagination
+PORTAL_PAGE_SIZE = config('PORTAL_PAGE_SIZE', default=50, cast=int)
+PORTAL_MAX_PAGE_SIZE = config('PORTAL_MAX_PAGE_SIZE', default=200, cast=int)
+
+# Delta sync windows overlap by this much to cover rows committed after their timestamp
+STUDENT_SYNC_OVERLAP_SECONDS = config('STUDENT_SYNC_OVERLAP_SECONDS', default=5, cast=int)
+# Deletion tombstones are kept this long; older sync cursors get a reset instead
+STUDENT_DELETION_RETENTION_DAYS = config('STUDENT_DELETION_RETENTION_DAYS', default=7, cast=int)
+
+# Live student events (Server-Sent Events, served under ASGI). The broker class
+# must provide subscribe/unsubscribe/publish; slow clients are told to re-sync
+# once PORTAL_EVENT_QUEUE_SIZE events are waiting for them.
+PORTAL_EVENT_BROKER = config('PORTAL_EVENT_BROKER', default='portal.events.InProcessBroker')
+PORTAL_EVENT_QUEUE_SIZE = config('PORTAL_EVENT_QUEUE_SIZE', default=100, cast=int)
+PORTAL_EVENT_HEARTBEAT_SECONDS = config('PORTAL_EVENT_HEARTBEAT_SECONDS', default=15, cast=int)
+PORTAL_EVENT_STREAM_MAX_SECONDS = config('PORTAL_EVENT_STREAM_MAX_SECONDS', default=300, cast=int)
+
+# Marks needed to pass, used by the per-subject statistics. Run
+# 'manage.py rebuild_subject_stats' after changing it.
+PORTAL_PASS_MARKS = config('PORTAL_PASS_MARKS', default=40, cast=int)
+
+# Maximum number of edits accepted by the batch marks-update API
+PORTAL_MAX_BATCH_SIZE = config('PORTAL_MAX_BATCH_SIZE', default=500, cast=int)
+
+# Rows applied per transaction by the CSV student import
+PORTAL_IMPORT_CHUNK_SIZE = config('PORTAL_IMPORT_CHUNK_SIZE', default=1000, cast=int)
+
+# Rows fetched per database round trip by the streaming exports
+PORTAL_EXPORT_CHUNK_SIZE = config('PORTAL_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Audit logging: 'sync' writes entries inside the request transaction, 'buffered'
+# queues them after commit and bulk-inserts them from a background thread
+AUDIT_LOG_MODE = config('AUDIT_LOG_MODE', default='sync')
+AUDIT_BUFFER_BATCH_SIZE = config('AUDIT_BUFFER_BATCH_SIZE', default=200, cast=int)
+AUDIT_BUFFER_FLUSH_INTERVAL = config('AUDIT_BUFFER_FLUSH_INTERVAL', default=1.0, cast=float)
+AUDIT_BUFFER_MAX_QUEUE_SIZE = config('AUDIT_BUFFER_MAX_QUEUE_SIZE', default=10000, cast=int)
+
+# Audit log retention: entries older than AUDIT_RETENTION_DAYS are moved into
+# gzipped, day-partitioned files under AUDIT_ARCHIVE_DIR by archive_audit_log
+AUDIT_RETENTION_DAYS = config('AUDIT_RETENTION_DAYS', default=180, cast=int)
+AUDIT_ARCHIVE_DIR = config('AUDIT_ARCHIVE_DIR', default=str(BASE_DIR / 'audit_archive'))
+
+# Authentication tokens. 'session' (default) keeps the token in the Django
+# session and looks it up in the database on every request. 'signed' puts an
+# HMAC-signed, expiring token with the teacher id and token id in a cookie and
+# checks it without database reads: revoked tokens (logged out, or is_active
+# cleared in the admin) are kept in an in-memory set reloaded every
+# AUTH_REVOCATION_SYNC_SECONDS, so other processes honour a revocation within
+# that interval, and teachers are cached for AUTH_TEACHER_CACHE_SECONDS.
+AUTH_TOKEN_MODE = config('AUTH_TOKEN_MODE', default='session')
+if AUTH_TOKEN_MODE not in ('session', 'signed'):
+    raise ImproperlyConfigured(f"Unknown AUTH_TOKEN_MODE '{AUTH_TOKEN_MODE}'")
+AUTH_REVOCATION_SYNC_SECONDS = config('AUTH_REVOCATION_SYNC_SECONDS', default=10, cast=int)
+AUTH_TEACHER_CACHE_SECONDS = config('AUTH_TEACHER_CACHE_SECONDS', default=60, cast=int)
+
+# Session token and tombstone cleanup: run 'manage.py purge_session_tokens' and
+# 'manage.py purge_student_deletions' from cron, or set SESSION_TOKEN_SWEEP_INTERVAL
+# (seconds) to sweep both from a thread in the server process
+SESSION_TOKEN_SWEEP_INTERVAL = config('SESSION_TOKEN_SWEEP_INTERVAL', default=0, cast=int)
+SESSION_TOKEN_SWEEP_BATCH_SIZE = config('SESSION_TOKEN_SWEEP_BATCH_SIZE', default=1000, cast=int)
+SESSION_TOKEN_SWEEP_MAX_BATCHES = config('SESSION_TOKEN_SWEEP_MAX_BATCHES', default=0, cast=int)
+
+# Request metrics, served in Prometheus text format at /metrics to requests
+# carrying 'Authorization: Bearer <METRICS_TOKEN>' (disabled while the token is
+# empty). Requests slower than METRICS_SLOW_REQUEST_MS or running at least
+# METRICS_SLOW_REQUEST_QUERIES queries are logged to 'portal.metrics'; 0 disables either.
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_LATENCY_BUCKETS = config(
+    'METRICS_LATENCY_BUCKETS', default='0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5',
+    cast=lambda value: [float(bound) for bound in value.split(',') if bound.strip()]
+)
+METRICS_SLOW_REQUEST_MS = config('METRICS_SLOW_REQUEST_MS', default=500, cast=int)
+METRICS_SLOW_REQUEST_QUERIES = config('METRICS_SLOW_REQUEST_QUERIES', default=0, cast=int)
+
+# Cache. CACHE_PROFILE selects 'locmem' (default, per process) or 'file'
+# (CACHE_DIR, shared by every process on the host). Use 'file' when serving
+# with several worker processes or when management commands such as
+# import_students change students, so their invalidations reach the server.
+CACHE_PROFILE = config('CACHE_PROFILE', default='locmem')
+if CACHE_PROFILE == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'teacherportal',
+            'OPTIONS': {
+                'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=1000, cast=int),
+            },
+        }
+    }
+elif CACHE_PROFILE == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_DIR', default=str(BASE_DIR / 'cache')),
+            'OPTIONS': {
+                'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=1000, cast=int),
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unknown CACHE_PROFILE '{CACHE_PROFILE}'")
+
+# Rendered student table pages are cached for this long, keyed by a data
+# version that every student change replaces; 0 disables the cache
+STUDENT_TABLE_CACHE_SECONDS = config('STUDENT_TABLE_CACHE_SECONDS', default=300, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -14,10 +14,20 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
+from portal.views import static_asset
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('portal.urls')),
-]
\ No newline at end of file
+]
+
+if settings.STATIC_PIPELINE:
+    # Hashed, precompressed files written by collectstatic (run the dev server with --nostatic)
+    urlpatterns += [
+        re_path(rf'^{re.escape(settings.STATIC_URL.lstrip("/"))}(?P<path>.+)$', static_asset, name='static_asset'),
+    ]
\ No newline at end of file
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tailwebs_teacherportal.settings')
 
 application = get_wsgi_application()
+
+from portal.sweeper import start_session_token_sweeper  # noqa: E402
+
+start_session_token_sweeper()